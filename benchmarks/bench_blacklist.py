@@ -0,0 +1,71 @@
+"""Micro-benchmark: BlacklistMatcher vs cách quét cũ `any(word in msg for word in blacklist)`
+
+Chạy: python benchmarks/bench_blacklist.py
+"""
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_overlay import BlacklistMatcher  # noqa: E402
+
+SIZES = (10, 1000, 10000)
+MESSAGE_COUNT = 1000
+REPEAT = 5
+
+
+def random_word(rng, min_len=3, max_len=10):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len)))
+
+
+def make_messages(rng, vocabulary):
+    messages = []
+    for _ in range(MESSAGE_COUNT):
+        words = [random_word(rng) for _ in range(rng.randint(3, 15))]
+        # ~5% tin nhắn chứa từ cấm
+        if vocabulary and rng.random() < 0.05:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(vocabulary))
+        messages.append(' '.join(words))
+    return messages
+
+
+def legacy_scan(blacklist, messages):
+    blocked = 0
+    for message in messages:
+        msg_lower = message.lower()
+        if any(bad_word in msg_lower for bad_word in blacklist):
+            blocked += 1
+    return blocked
+
+
+def matcher_scan(matcher, messages):
+    blocked = 0
+    for message in messages:
+        if matcher.search(message):
+            blocked += 1
+    return blocked
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{MESSAGE_COUNT} tin nhắn / lần, best of {REPEAT}")
+    print(f"{'entries':>8} | {'compile ms':>10} | {'legacy us/msg':>13} | {'matcher us/msg':>14} | {'speedup':>7}")
+    for size in SIZES:
+        blacklist = [random_word(rng, 4, 12) for _ in range(size)]
+        messages = make_messages(rng, blacklist)
+
+        compile_s = min(timeit.repeat(lambda: BlacklistMatcher(blacklist), number=1, repeat=REPEAT))
+        matcher = BlacklistMatcher(blacklist)
+
+        legacy_s = min(timeit.repeat(lambda: legacy_scan(blacklist, messages), number=1, repeat=REPEAT))
+        matcher_s = min(timeit.repeat(lambda: matcher_scan(matcher, messages), number=1, repeat=REPEAT))
+
+        print(f"{size:>8} | {compile_s * 1e3:>10.2f} | {legacy_s / MESSAGE_COUNT * 1e6:>13.2f} | "
+              f"{matcher_s / MESSAGE_COUNT * 1e6:>14.2f} | {legacy_s / matcher_s:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Micro-benchmark: dựng rich text cho tin nhắn - inline style (cách cũ) vs ChatStyle (template biên dịch sẵn)
+
+Chạy: python benchmarks/bench_chat_render.py  (cần PyQt5; không cần màn hình)
+"""
+import html
+import os
+import random
+import string
+import sys
+import timeit
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QFont, QTextDocument  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from youtube_chat_overlay import ChatMessage, ChatStyle, parse_css_color  # noqa: E402
+
+MESSAGE_COUNT = 2000
+REPEAT = 5
+TEXT_WIDTH = 320
+CONFIG = {
+    'show_timestamp': True,
+    'show_author': True,
+    'author_color': '#6366f1',
+    'time_color': '#888888',
+    'message_color': '#ffffff',
+    'accent_color': '#6366f1',
+    'msg_bg_color': 'rgba(255, 255, 255, 10)',
+    'font_size': 14,
+}
+
+
+def random_text(rng, words):
+    return ' '.join(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+                    for _ in range(words))
+
+
+def make_messages(rng):
+    messages = []
+    for _ in range(MESSAGE_COUNT):
+        roll = rng.random()
+        messages.append(ChatMessage(random_text(rng, 2), random_text(rng, rng.randint(3, 20)), "12:34",
+                                    is_member=0.8 <= roll < 0.95, is_superchat=roll >= 0.95, sc_amount="$5.00"))
+    return messages
+
+
+def legacy_styles(config, record):
+    msg_bg = config.get('msg_bg_color', 'rgba(255, 255, 255, 10)')
+    border_color = config.get('accent_color', '#6366f1')
+    author_color = config.get('author_color', '#6366f1')
+    if record.is_superchat:
+        msg_bg = 'rgba(218, 165, 32, 40)'
+        border_color = '#FFD700'
+        author_color = '#FFD700'
+    elif record.is_member:
+        author_color = '#34D399'
+        border_color = '#34D399'
+    return msg_bg, border_color, author_color
+
+
+def legacy_html(config, record):
+    author_color = legacy_styles(config, record)[2]
+    full_text = ""
+    if config.get('show_timestamp', True):
+        full_text += f"<span style='color: {config.get('time_color', '#888888')};'>{record.timestamp}</span> "
+    prefix = ""
+    if record.is_superchat:
+        prefix = f"<span style='color: #FFD700; font-weight: bold;'>[SC {html.escape(record.sc_amount)}] </span>"
+    elif record.is_member:
+        prefix = "<span style='color: #34D399; font-weight: bold;'>[Member] </span>"
+    if config.get('show_author', True):
+        full_text += f"{prefix}<span style='color: {author_color}; font-weight: 600;'>{html.escape(record.author)}:</span> "
+    else:
+        full_text += prefix
+    full_text += f"<span style='color: {config.get('message_color', '#ffffff')};'>{html.escape(record.message)}</span>"
+    return full_text
+
+
+def legacy_document(config, record):
+    doc = QTextDocument()
+    font = QFont()
+    font.setPixelSize(config.get('font_size', 14))
+    doc.setDefaultFont(font)
+    doc.setDocumentMargin(0)
+    doc.setHtml(legacy_html(config, record))
+    doc.setTextWidth(TEXT_WIDTH)
+    return doc
+
+
+def legacy_paint_colors(config, record):
+    msg_bg, border_color, _ = legacy_styles(config, record)
+    return parse_css_color(msg_bg), parse_css_color(border_color)
+
+
+def style_document(style, font, record):
+    doc = QTextDocument()
+    doc.setDefaultFont(font)
+    doc.setDocumentMargin(0)
+    doc.setHtml(style.render(record))
+    doc.setTextWidth(TEXT_WIDTH)
+    return doc
+
+
+def best(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT)) / MESSAGE_COUNT * 1e6
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    rng = random.Random(42)
+    messages = make_messages(rng)
+
+    style = ChatStyle()
+    compile_us = min(timeit.repeat(lambda: (setattr(style, '_key', None), style.compile(CONFIG)),
+                                   number=1, repeat=REPEAT)) * 1e6
+    font = QFont()
+    font.setPixelSize(CONFIG['font_size'])
+
+    rows = [
+        ("html", lambda: [legacy_html(CONFIG, m) for m in messages],
+                 lambda: [style.render(m) for m in messages]),
+        ("document", lambda: [legacy_document(CONFIG, m) for m in messages],
+                     lambda: [style_document(style, font, m) for m in messages]),
+        ("paint colors", lambda: [legacy_paint_colors(CONFIG, m) for m in messages],
+                         lambda: [style.colors[ChatStyle.kind(m)] for m in messages]),
+    ]
+
+    print(f"{MESSAGE_COUNT} tin nhắn / lần, best of {REPEAT}; ChatStyle.compile: {compile_us:.0f} us / config")
+    print(f"{'stage':>12} | {'legacy us/msg':>13} | {'style us/msg':>12} | {'speedup':>7}")
+    for name, legacy, new in rows:
+        legacy_us = best(legacy)
+        new_us = best(new)
+        print(f"{name:>12} | {legacy_us:>13.2f} | {new_us:>12.2f} | {legacy_us / new_us:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
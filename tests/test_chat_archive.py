@@ -0,0 +1,107 @@
+import sqlite3
+
+from youtube_chat_overlay import ChatArchive
+
+SENT_AT = 1700000000.0
+
+
+def message(author, text, msg_id=None, sent_at=SENT_AT, is_superchat=False):
+    return (author, text, False, is_superchat, "$5.00" if is_superchat else "", sent_at, "", msg_id)
+
+
+def archive_with(tmp_path, *batches):
+    archive = ChatArchive(str(tmp_path / 'chat_archive.db'))
+    archive.start()
+    for batch in batches:
+        archive.add('video01', batch)
+    archive.close()  # Writer ghi nốt hàng đợi rồi dừng
+    return archive
+
+
+def texts(rows):
+    return sorted(row['message'] for row in rows)
+
+
+def test_same_msg_id_is_stored_once(tmp_path):
+    archive = archive_with(tmp_path,
+                           [message("alice", "hello", msg_id="id-1"), message("bob", "hi", msg_id="id-2")],
+                           [message("alice", "hello", msg_id="id-1"), message("carol", "no id")],
+                           [message("carol", "no id")])
+
+    assert archive.written == 4
+    assert archive.dropped == 0
+    assert texts(archive.search()) == ["hello", "hi", "no id", "no id"]
+
+
+class OneBatchArchive(ChatArchive):
+    QUEUE_BATCHES = 1
+
+
+def test_full_queue_counts_dropped_rows(tmp_path):
+    archive = OneBatchArchive(str(tmp_path / 'chat_archive.db'))  # Writer chưa chạy
+
+    archive.add('video01', [message("a", "kept")])
+    archive.add('video01', [message("b", "lost"), message("c", "lost")])
+    assert archive.dropped == 2
+
+    archive.start()
+    archive.close()
+    assert archive.written == 1
+
+
+def test_text_search_matches_word_prefixes(tmp_path):
+    archive = archive_with(tmp_path, [message("a", "streaming tonight"), message("b", "stream ended"),
+                                      message("c", "upstream tonight")])
+
+    assert archive.fts
+    assert texts(archive.search(text="stream")) == ["stream ended", "streaming tonight"]
+    assert texts(archive.search(text="stream tonight")) == ["streaming tonight"]
+
+
+def test_fts_operators_and_quotes_are_literal(tmp_path):
+    archive = archive_with(tmp_path, [message("a", 'he said "hi" AND left'), message("b", "hi NOT there"),
+                                      message("c", "hi")])
+
+    # AND/NOT/dấu ngoặc kép là từ thường, không phải cú pháp FTS5
+    assert texts(archive.search(text='"hi"')) == ['he said "hi" AND left', "hi", "hi NOT there"]
+    assert texts(archive.search(text="hi NOT")) == ["hi NOT there"]
+    assert texts(archive.search(text="AND")) == ['he said "hi" AND left']
+
+
+def test_author_prefix_escapes_like_wildcards(tmp_path):
+    archive = archive_with(tmp_path, [message("50%off", "a"), message("50 cents", "b"),
+                                      message("user_1", "c"), message("userX1", "d"), message("Alice", "e")])
+
+    assert texts(archive.search(author="50%")) == ["a"]
+    assert texts(archive.search(author="user_")) == ["c"]
+    assert texts(archive.search(author="ali")) == ["e"]
+
+
+def test_like_fallback_escapes_wildcards(tmp_path):
+    archive = archive_with(tmp_path, [message("a", "100% sure"), message("b", "100 percent"),
+                                      message("c", "snake_case"), message("d", "snakeXcase")])
+    archive.fts = False
+
+    assert texts(archive.search(text="100%")) == ["100% sure"]
+    assert texts(archive.search(text="e_c")) == ["snake_case"]
+
+
+def test_superchat_and_time_filters(tmp_path):
+    archive = archive_with(tmp_path, [message("a", "old", sent_at=SENT_AT - 3600),
+                                      message("b", "new"), message("c", "paid", is_superchat=True)])
+
+    assert texts(archive.search(superchat_only=True)) == ["paid"]
+    assert texts(archive.search(since=SENT_AT - 60)) == ["new", "paid"]
+    assert texts(archive.search(until=SENT_AT - 60)) == ["old"]
+
+
+def test_author_prefix_uses_index(tmp_path):
+    archive = archive_with(tmp_path, [message("alice", "x")])
+    sql, params = archive._build_query("ali", "", False, None, None, 500)
+
+    conn = sqlite3.connect(archive.path)
+    try:
+        plan = ' '.join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    finally:
+        conn.close()
+    assert "messages_author" in plan, plan
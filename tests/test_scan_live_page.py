@@ -0,0 +1,81 @@
+import os
+
+from youtube_chat_overlay import LIVE_PAGE_MAX_BYTES, scan_live_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CHUNK_SIZE = 16 * 1024
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class CountingChunks:
+    """Chia trang thành chunk như iter_content() và đếm số chunk đã bị đọc"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+
+def split(data, size=CHUNK_SIZE):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_canonical_link_stops_at_first_chunk():
+    page = load('live_canonical.html')
+    chunks = CountingChunks(split(page))
+    assert len(chunks.chunks) > 3
+
+    assert scan_live_page(chunks) == ('AbCdEfGhIjK', 'Canonical')
+    assert chunks.consumed == 1
+
+
+def test_video_id_fallback_after_head():
+    page = load('live_no_canonical.html')
+    chunks = CountingChunks(split(page))
+
+    assert scan_live_page(chunks) == ('Live_Vid-01', 'Regex')
+    # Dừng ở chunk chứa "videoId" đầu tiên, không tải phần còn lại của trang
+    assert chunks.consumed == page.index(b'"videoId"') // CHUNK_SIZE + 1
+    assert chunks.consumed < len(chunks.chunks)
+
+
+def test_match_split_across_chunks():
+    page = load('live_canonical.html')
+    cut = page.index(b'watch?v=AbCd') + len(b'watch?v=AbCd')
+    chunks = CountingChunks([page[:cut], page[cut:]])
+
+    assert scan_live_page(chunks) == ('AbCdEfGhIjK', 'Canonical')
+    assert chunks.consumed == 2
+
+
+def test_video_id_split_across_chunks():
+    page = load('live_no_canonical.html')
+    cut = page.index(b'"videoId":"Live') + len(b'"videoId":"Live')
+
+    assert scan_live_page([page[:cut], page[cut:]]) == ('Live_Vid-01', 'Regex')
+
+
+def test_stops_at_max_bytes():
+    def endless():
+        yield b'<html><head><title>Demo</title></head><body>'
+        while True:
+            yield b'x' * CHUNK_SIZE
+
+    chunks = CountingChunks(endless())
+
+    assert scan_live_page(chunks) == (None, None)
+    # Chunk đầu ngắn, sau đó vừa chạm 4 MB thì dừng
+    assert chunks.consumed == LIVE_PAGE_MAX_BYTES // CHUNK_SIZE + 1
+
+
+def test_watch_link_used_when_no_video_id():
+    page = b'<html><head></head><body><a href="/watch?v=OtherVid_02">x</a></body></html>'
+
+    assert scan_live_page(split(page, 16)) == ('OtherVid_02', 'Regex')
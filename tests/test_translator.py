@@ -0,0 +1,57 @@
+from youtube_chat_overlay import StubTranslateBackend, Translator
+
+
+def test_batch_is_one_request_and_cached():
+    backend = StubTranslateBackend()
+    translator = Translator(backend)
+
+    assert translator.translate_many(["hello", "good  night", "hello"], 'vi') == [
+        "[vi] hello", "[vi] good night", "[vi] hello"]
+    assert backend.calls == 1
+
+    assert translator.translate("hello", 'vi') == "[vi] hello"
+    assert backend.calls == 1
+    stats = translator.stats()
+    assert stats['hits'] == 1 and stats['requests'] == 1 and stats['entries'] == 2
+
+
+def test_cache_is_per_language():
+    backend = StubTranslateBackend()
+    translator = Translator(backend)
+
+    translator.translate("hello", 'vi')
+    assert translator.translate("hello", 'en') == "[en] hello"
+    assert backend.calls == 2
+
+
+def test_line_mismatch_retries_one_by_one():
+    backend = StubTranslateBackend()
+    merge_once = [True]
+
+    def translate(text, dest, src='auto'):
+        backend.calls += 1
+        if '\n' in text and merge_once[0]:
+            merge_once[0] = False
+            return text.replace('\n', ' ')  # Backend gộp hai câu thành một dòng
+        return f"[{dest}] {text}"
+
+    backend.translate = translate
+    translator = Translator(backend)
+
+    assert translator.translate_many(["one", "two"], 'vi') == ["[vi] one", "[vi] two"]
+    assert backend.calls == 3
+
+
+def test_empty_text_skips_backend():
+    backend = StubTranslateBackend()
+    translator = Translator(backend)
+
+    assert translator.translate("   ", 'vi') == ""
+    assert backend.calls == 0
+
+
+def test_lru_bound():
+    translator = Translator(StubTranslateBackend(), max_entries=2)
+
+    translator.translate_many(["a", "b", "c"], 'vi')
+    assert translator.stats()['entries'] == 2
@@ -1,9 +1,25 @@
 import sys
+import os
+import asyncio
+import bisect
+import functools
+import time
 import json
+import hashlib
+import heapq
+import html
+import io
+import queue
+import unicodedata
 import random
 import re
+import shutil
+import sqlite3
+import subprocess
 import threading
 import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 # Setup logging
@@ -16,11 +32,14 @@ logging.basicConfig(
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
                              QSlider, QCheckBox, QScrollArea, QFrame, QSizeGrip, 
-                             QMessageBox, QComboBox, QColorDialog, QGraphicsOpacityEffect, QMenu,
-                             QSystemTrayIcon, QAction, QTextEdit, QRadioButton, QButtonGroup, QInputDialog, QDialog)
-from PyQt5.QtCore import (Qt, QTimer, QPoint, QSize, QPropertyAnimation, 
-                          QEasingCurve, pyqtSignal, QRect, QThread, QWaitCondition, QMutex)
-from PyQt5.QtGui import QFont, QColor, QPalette, QIcon, QCursor, QPixmap, QPainter
+                             QMessageBox, QComboBox, QColorDialog, QMenu,
+                             QSystemTrayIcon, QAction, QTextEdit, QRadioButton, QButtonGroup, QInputDialog, QDialog,
+                             QListView, QStyledItemDelegate, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QTimer, QPoint, QSize, 
+                          pyqtSignal, QRect, QRectF, QThread, QWaitCondition, QMutex,
+                          QAbstractListModel, QModelIndex, QEvent, QObject)
+from PyQt5.QtGui import (QFont, QColor, QPalette, QIcon, QCursor, QPixmap, QPainter,
+                         QPainterPath, QTextDocument)
 
 try:
     import requests
@@ -34,9 +53,12 @@ except ImportError:
 
 try:
     from gtts import gTTS
+    GTTS_AVAILABLE = True
+except ImportError:
+    GTTS_AVAILABLE = False
+
+try:
     import pygame
-    import os
-    import time
     from mtranslate import translate as google_translate
     TTS_AVAILABLE = True
 
@@ -57,11 +79,590 @@ except ImportError:
     print("Warning: pytchat not installed. Only demo mode available.")
     print("Install with: pip install pytchat")
 
+class BlacklistMatcher:
+    """Bộ lọc từ cấm biên dịch sẵn thành một regex duy nhất (dạng trie)
+
+    Từ có hai đầu là chữ/số chỉ khớp nguyên từ (không bắt "spam" trong "spammer" nếu
+    whole_word=True); từ bắt đầu/kết thúc bằng ký tự khác (".com", "$$$") vẫn khớp chuỗi con.
+    fold_diacritics=True bỏ dấu trước khi so khớp ("co bac" khớp "cờ bạc").
+    """
+    _COMBINING = re.compile(r'[\u0300-\u036f]+')
+    _FOLD_TABLE = str.maketrans({'đ': 'd', 'Đ': 'd'})
+
+    def __init__(self, words=(), whole_word=True, fold_diacritics=False):
+        self.whole_word = whole_word
+        self.fold_diacritics = fold_diacritics
+        normalized = (self.normalize(word.strip()) for word in words)
+        self.words = list(dict.fromkeys(word for word in normalized if word))
+        self._pattern = self._compile()
+
+    def normalize(self, text):
+        text = unicodedata.normalize('NFC', text).casefold()
+        if self.fold_diacritics:
+            text = self._COMBINING.sub('', unicodedata.normalize('NFD', text)).translate(self._FOLD_TABLE)
+        return text
+
+    def _compile(self):
+        if not self.words:
+            return None
+        bounded, loose = [], []
+        for word in self.words:
+            if self.whole_word and re.match(r'\w', word) and re.search(r'\w$', word):
+                bounded.append(word)
+            else:
+                loose.append(word)
+
+        parts = []
+        if bounded:
+            parts.append(r'(?<!\w)' + self._trie_regex(self._build_trie(bounded)) + r'(?!\w)')
+        if loose:
+            parts.append(self._trie_regex(self._build_trie(loose)))
+        return re.compile('|'.join(parts))
+
+    @staticmethod
+    def _build_trie(words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = True
+        return trie
+
+    @classmethod
+    def _trie_regex(cls, node):
+        """Chuyển trie thành regex không cần backtrack giữa các nhánh có chung tiền tố"""
+        alternatives = []
+        single_chars = []
+        for char in sorted(k for k in node if k):
+            child = node[char]
+            if list(child) == ['']:
+                single_chars.append(re.escape(char))
+            else:
+                alternatives.append(re.escape(char) + cls._trie_regex(child))
+
+        if len(single_chars) == 1:
+            alternatives.append(single_chars[0])
+        elif single_chars:
+            alternatives.append('[' + ''.join(single_chars) + ']')
+
+        if not alternatives:
+            return ''
+        result = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        if '' in node:
+            # Từ ngắn hơn kết thúc tại đây - phần còn lại là tuỳ chọn
+            return '(?:' + result + ')?'
+        return result
+
+    def search(self, text):
+        """Trả về từ cấm đầu tiên tìm thấy trong text, hoặc None"""
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(self.normalize(text))
+        return match.group(0) if match else None
+
+    def __len__(self):
+        return len(self.words)
+
+
+TTS_CACHE_DIR = 'tts_cache'
+
+
+class TTSAudio:
+    """Audio đã tổng hợp, giữ hoàn toàn trong RAM (mp3 gốc + PCM nếu đã giải mã)"""
+    __slots__ = ('data', 'fmt', 'sound', 'pcm_bytes', 'key')
+
+    def __init__(self, data, fmt='mp3'):
+        self.data = data
+        self.fmt = fmt
+        self.sound = None
+        self.pcm_bytes = 0
+        self.key = None # Key trong TTSAudioCache (gán khi được cache)
+
+    def stream(self):
+        return io.BytesIO(self.data)
+
+    def decode(self):
+        """Giải mã thành pygame Sound (PCM) - chỉ giải mã lần đầu"""
+        if self.sound is None:
+            self.sound = pygame.mixer.Sound(file=self.stream())
+            frequency, size, channels = pygame.mixer.get_init()
+            self.pcm_bytes = int(self.sound.get_length() * frequency * channels * abs(size) // 8)
+        return self.sound
+
+    def release_pcm(self):
+        self.sound = None
+        self.pcm_bytes = 0
+
+    def nbytes(self):
+        return len(self.data) + self.pcm_bytes
+
+
+class TTSAudioCache:
+    """Cache audio TTS theo nội dung (engine, text chuẩn hoá, ngôn ngữ, tốc độ)
+
+    Tầng RAM là LRU giới hạn theo số byte; tầng đĩa (tuỳ chọn) lưu file <sha1>.<fmt>
+    trong disk_dir và xoá file cũ nhất khi vượt disk_max_bytes.
+    Mỗi entry lưu kèm số byte đã tính; giải mã/bỏ PCM sau khi cache thì gọi recount().
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024, disk_dir=None, disk_max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict() # key -> (TTSAudio, số byte đã tính)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text, lang, slow=False, engine='gtts'):
+        normalized = ' '.join(unicodedata.normalize('NFC', text).casefold().split())
+        return hashlib.sha1(f"{engine}|{lang}|{int(slow)}|{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        audio = self._read_disk(key)
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        with self._lock:
+            self._insert(key, audio)
+        self._write_disk(key, audio)
+
+    def recount(self, audio):
+        """PCM vừa được giải mã/bỏ đi: tính lại dung lượng entry rồi dọn LRU nếu vượt"""
+        with self._lock:
+            entry = self._entries.get(audio.key)
+            if entry is None or entry[0] is not audio:
+                return
+            size = audio.nbytes()
+            self._bytes += size - entry[1]
+            self._entries[audio.key] = (audio, size)
+            self._evict()
+
+    def _insert(self, key, audio):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        audio.key = key
+        size = audio.nbytes()
+        self._entries[key] = (audio, size)
+        self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def _disk_path(self, key, fmt):
+        return os.path.join(self.disk_dir, f"{key}.{fmt}")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        for fmt in ('mp3', 'wav'):
+            path = self._disk_path(key, fmt)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            # Cập nhật mtime để việc dọn dẹp giữ lại file hay dùng
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return TTSAudio(data, fmt)
+        return None
+
+    def _write_disk(self, key, audio):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key, audio.fmt)
+            if os.path.exists(path):
+                return
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(audio.data)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except OSError as e:
+            logging.warning(f"TTS disk cache write failed: {e}")
+
+    def _trim_disk(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+class GTTSBackend:
+    """Engine Google TTS (online, trả về mp3)"""
+    name = 'gtts'
+    label = "Google (Online)"
+    network = True
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+
+    def available(self):
+        return GTTS_AVAILABLE
+
+    def synthesize(self, text, lang, slow=False):
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=slow, timeout=self.timeout).write_to_fp(buffer)
+        return TTSAudio(buffer.getvalue(), 'mp3')
+
+
+class EspeakBackend:
+    """Engine eSpeak NG (offline, chạy tiến trình espeak-ng, WAV qua stdout - không ghi file)"""
+    name = 'espeak'
+    label = "eSpeak NG (Offline)"
+    network = False
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self.executable = shutil.which('espeak-ng') or shutil.which('espeak')
+
+    def available(self):
+        return bool(self.executable)
+
+    def synthesize(self, text, lang, slow=False):
+        # Text đưa qua stdin để không bị hiểu nhầm thành tham số dòng lệnh
+        result = subprocess.run(
+            [self.executable, '-v', lang, '-s', '130' if slow else '175', '-b', '1', '--stdout'],
+            input=text.encode('utf-8'),
+            capture_output=True,
+            timeout=self.timeout,
+            check=True,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+        )
+        return TTSAudio(result.stdout, 'wav')
+
+
+class MTranslateBackend:
+    """Backend dịch dùng mtranslate (Google Translate web, cần mạng)"""
+    name = 'mtranslate'
+
+    def translate(self, text, dest, src='auto'):
+        return google_translate(text, dest, src)
+
+
+class StubTranslateBackend:
+    """Backend dịch giả lập không cần mạng (dùng khi test)"""
+    name = 'stub'
+
+    def __init__(self, func=None):
+        self.func = func or (lambda text, dest: f"[{dest}] {text}")
+        self.calls = 0
+
+    def translate(self, text, dest, src='auto'):
+        self.calls += 1
+        return '\n'.join(self.func(line, dest) for line in text.split('\n'))
+
+
+class Translator:
+    """Lớp dịch có cache LRU (theo text sau khi expand slang + ngôn ngữ đích) và dịch gộp
+
+    translate_many() ghép các câu chưa có trong cache bằng xuống dòng thành một request
+    rồi tách kết quả; nếu số dòng trả về không khớp thì dịch lại từng câu.
+    """
+    SEPARATOR = '\n'
+
+    def __init__(self, backend, max_entries=2048):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def translate(self, text, dest):
+        return self.translate_many([text], dest)[0]
+
+    def translate_many(self, texts, dest):
+        # Mỗi câu phải nằm trên một dòng để tách kết quả
+        texts = [' '.join(text.split()) for text in texts]
+        results = [None] * len(texts)
+        missing = OrderedDict()
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (text, dest)
+                if not text:
+                    results[i] = text
+                elif key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(text, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            translated = self._translate_batch(list(missing), dest)
+            with self._lock:
+                for text, result in zip(missing, translated):
+                    for i in missing[text]:
+                        results[i] = result
+                    if result:
+                        self._cache[(text, dest)] = result
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return results
+
+    def _translate_batch(self, texts, dest):
+        self.requests += 1
+        joined = self.backend.translate(self.SEPARATOR.join(texts), dest, 'auto')
+        lines = (joined or '').split(self.SEPARATOR)
+        if len(lines) == len(texts):
+            return [line.strip() for line in lines]
+        if len(texts) == 1:
+            return [(joined or '').strip()]
+        # Backend gộp/tách dòng khác đi - dịch lại từng câu
+        logging.debug(f"Batch translation returned {len(lines)} lines for {len(texts)} texts, retrying one by one")
+        return [self._translate_batch([text], dest)[0] for text in texts]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'requests': self.requests,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._cache),
+            }
+
+
+class TTSQueueItem:
+    """Một tin nhắn chờ đọc"""
+    __slots__ = ('text', 'is_member', 'is_superchat', 'created', 'seq', 'key')
+
+    def __init__(self, text, is_member=False, is_superchat=False):
+        self.text = text
+        self.is_member = is_member
+        self.is_superchat = is_superchat
+        self.created = time.monotonic()
+        self.seq = 0
+        self.key = 0.0
+
+    @property
+    def is_paid(self):
+        return self.is_member or self.is_superchat
+
+    @property
+    def priority(self):
+        """2 = Super Chat, 1 = Member, 0 = tin thường"""
+        return 2 if self.is_superchat else 1 if self.is_member else 0
+
+    def __lt__(self, other):
+        return (self.key, self.seq) < (other.key, other.seq)
+
+
+class TTSQueue:
+    """Hàng đợi TTS ưu tiên (heap) có giới hạn, với chính sách xử lý khi quá tải
+
+    Thứ tự đọc: Super Chat trước, rồi Member, rồi tin thường; cùng mức thì theo thứ tự đến.
+    Ưu tiên được quy ra thời gian (PRIORITY_BONUS giây): tin thường đã chờ lâu hơn mức đó
+    sẽ được đọc trước tin ưu tiên mới đến, nên không bị "đói" mãi (aging).
+
+    - drop_oldest: đầy thì bỏ tin cũ nhất có mức ưu tiên thấp nhất
+    - drop_newest: đầy thì bỏ tin mới đến
+    - paid_only: đầy thì chỉ nhận Super Chat/Member (đẩy tin thường cũ nhất ra)
+    - sample: từ nửa hàng đợi trở lên chỉ nhận 1 trong N tin thường
+    - coalesce: bỏ tin trùng nội dung với tin đang chờ
+    Tin chờ lâu hơn max_age giây (0 = tắt) bị bỏ khi lấy ra, trừ Super Chat.
+    """
+    POLICIES = ('drop_oldest', 'drop_newest', 'paid_only', 'sample', 'coalesce')
+    PRIORITY_BONUS = {2: 300.0, 1: 30.0, 0: 0.0}
+
+    def __init__(self, maxlen=50, policy='drop_oldest', max_age=60, sample_every=3):
+        self.maxlen = maxlen
+        self.policy = policy
+        self.max_age = max_age
+        self.sample_every = sample_every
+        self._heap = []
+        self._seq = 0
+        self._texts = {} # text chuẩn hoá -> số tin đang chờ (cho coalesce)
+        self._sample_counter = 0
+        self.dropped = {'overflow': 0, 'policy': 0, 'expired': 0, 'coalesced': 0}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    @staticmethod
+    def _text_key(text):
+        return ' '.join(text.casefold().split())
+
+    def push(self, item):
+        """Thêm tin, trả về False nếu tin bị bỏ theo chính sách"""
+        if self.policy == 'coalesce' and self._texts.get(self._text_key(item.text)):
+            self.dropped['coalesced'] += 1
+            return False
+
+        if self.policy == 'sample' and not item.is_paid and len(self._heap) >= self.maxlen // 2:
+            self._sample_counter += 1
+            if self._sample_counter % max(1, self.sample_every):
+                self.dropped['policy'] += 1
+                return False
+
+        if len(self._heap) >= self.maxlen:
+            if self.policy == 'drop_newest':
+                self.dropped['overflow'] += 1
+                return False
+            if self.policy == 'paid_only':
+                if not item.is_paid:
+                    self.dropped['policy'] += 1
+                    return False
+                self._remove(self._victim(regular_only=True))
+                self.dropped['policy'] += 1
+            else:
+                victim = self._victim()
+                if victim.priority > item.priority:
+                    # Không đẩy tin ưu tiên hơn ra để nhường chỗ cho tin thường
+                    self.dropped['overflow'] += 1
+                    return False
+                self._remove(victim)
+                self.dropped['overflow'] += 1
+
+        self._seq += 1
+        item.seq = self._seq
+        item.key = item.created - self.PRIORITY_BONUS[item.priority]
+        heapq.heappush(self._heap, item)
+        key = self._text_key(item.text)
+        self._texts[key] = self._texts.get(key, 0) + 1
+        return True
+
+    def _victim(self, regular_only=False):
+        """Tin sẽ bị bỏ khi đầy: mức ưu tiên thấp nhất, cũ nhất"""
+        candidates = [old for old in self._heap if not old.is_paid] if regular_only else None
+        return min(candidates or self._heap, key=lambda old: (old.priority, old.seq))
+
+    def _remove(self, item):
+        self._heap.remove(item)
+        heapq.heapify(self._heap)
+        self._forget(item)
+
+    def _forget(self, item):
+        key = self._text_key(item.text)
+        count = self._texts.get(key, 0) - 1
+        if count > 0:
+            self._texts[key] = count
+        else:
+            self._texts.pop(key, None)
+
+    def trim(self):
+        """maxlen vừa giảm: bỏ bớt tin ưu tiên thấp nhất, cũ nhất"""
+        while len(self._heap) > self.maxlen:
+            self._remove(self._victim())
+            self.dropped['overflow'] += 1
+
+    def pop(self):
+        """Lấy tin ưu tiên nhất (bỏ qua tin quá max_age), None nếu rỗng"""
+        now = time.monotonic()
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            self._forget(item)
+            if self.max_age and not item.is_superchat and now - item.created > self.max_age:
+                self.dropped['expired'] += 1
+                continue
+            return item
+        return None
+
+    def take(self, count):
+        items = []
+        while len(items) < count:
+            item = self.pop()
+            if item is None:
+                break
+            items.append(item)
+        return items
+
+    def clear(self):
+        self._heap.clear()
+        self._texts.clear()
+
+    def dropped_total(self):
+        return sum(self.dropped.values())
+
+
+class TTSJob:
+    """Một câu trong pipeline TTS (future của stage tổng hợp trả về TTSAudio)"""
+    __slots__ = ('text', 'lang', 'generation', 'future', 'created')
+
+    def __init__(self, text, lang, generation, future):
+        self.text = text
+        self.lang = lang
+        self.generation = generation
+        self.future = future
+        self.created = time.monotonic()
+
+
 class TTSThread(QThread):
     """Thread xử lý Text-to-Speech dùng Google Translate (Online)"""
-    def __init__(self):
+    SLANG_FILE = 'slang.json'
+    SLANG_CHECK_INTERVAL = 2.0
+    SYNTH_TIMEOUT = 30.0 # giây chờ tổng hợp một câu trước khi bỏ qua
+    TRANSLATE_TIMEOUT = 15.0 # giây chờ dịch một batch trước khi đọc nguyên bản
+
+    def __init__(self, network=None):
         super().__init__()
-        self.queue = []
+        self.network = network # NetworkLoop: dịch + tổng hợp chạy trên executor của network loop
+        self.queue = TTSQueue()
         self.running = True
         self.cond = QWaitCondition()
         self.mutex = QMutex()
@@ -69,33 +670,83 @@ class TTSThread(QThread):
         self.enabled = False
         self.translate_enabled = False
         self.translate_to_vi = True # True: En->Vi, False: Vi->En
+        self.keep_pcm = False # True: giữ PCM đã giải mã trong TTSAudio (cache) sau khi phát
+        self._skip_event = threading.Event() # Đánh thức stage phát khi skip/stop/flush
+        self.slow = False
+        self.audio_cache = TTSAudioCache()
+        # Engine tổng hợp giọng nói (name -> backend)
+        self.backends = {backend.name: backend for backend in (GTTSBackend(), EspeakBackend())}
+        self.engine = 'gtts'
+        self.fallback_engine = 'espeak'
+        self.fallback_enabled = True # Engine online lỗi/timeout -> dùng engine offline
+        self.translator = Translator(MTranslateBackend())
+        self.translate_batch_size = 8 # 1 = dịch từng tin
+        # Pipeline: dịch -> tổng hợp (prefetch) -> phát
+        self.prefetch_depth = 2 # Số câu được chuẩn bị trước trong lúc đang đọc
+        self.generation = 0 # Tăng mỗi lần flush để bỏ các job cũ
+        self._ready = deque() # TTSJob theo thứ tự, future trả về TTSAudio
+        self._in_flight = 0 # Số job đang dịch/tổng hợp/phát
+        self._synth_pool = None
         self.slang_dict = {}
+        self._slang = (None, {})
+        self._slang_mtime = None
+        self._slang_checked_at = time.monotonic()
         self.load_slang()
 
     def load_slang(self):
         try:
-            with open('slang.json', 'r', encoding='utf-8') as f:
+            with open(self.SLANG_FILE, 'r', encoding='utf-8') as f:
                 self.slang_dict = json.load(f)
+            self._slang_mtime = os.path.getmtime(self.SLANG_FILE)
         except Exception as e:
             print(f"Error loading slang.json: {e}")
             # Fallback empty or hardcoded if needed
             self.slang_dict = {}
+        self.compile_slang()
+
+    def compile_slang(self):
+        """Gộp toàn bộ slang thành một regex duy nhất (mỗi pattern là một named group)"""
+        parts = []
+        replacements = {}
+        for i, (pattern, replacement) in enumerate(self.slang_dict.items()):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logging.warning(f"Invalid slang pattern {pattern!r}: {e}")
+                continue
+            name = f"s{i}"
+            parts.append(f"(?P<{name}>{pattern})")
+            replacements[name] = replacement
+        # Gán một lần để thread khác không thấy trạng thái nửa vời
+        self._slang = (re.compile('|'.join(parts)) if parts else None, replacements)
+
+    def reload_slang_if_changed(self):
+        """Hot-reload slang.json khi file thay đổi (kiểm tra tối đa mỗi SLANG_CHECK_INTERVAL giây)"""
+        now = time.monotonic()
+        if now - self._slang_checked_at < self.SLANG_CHECK_INTERVAL:
+            return
+        self._slang_checked_at = now
+        try:
+            mtime = os.path.getmtime(self.SLANG_FILE)
+        except OSError:
+            return
+        if mtime != self._slang_mtime:
+            logging.info("slang.json changed, reloading")
+            self.load_slang()
 
     def expand_slang(self, text):
         """Mở rộng các từ lóng internet và gaming common"""
         processed_text = text.lower()
-        if not self.slang_dict:
+        self.reload_slang_if_changed()
+        pattern, replacements = self._slang
+        if pattern is None:
              return processed_text
-             
-        for pattern, replacement in self.slang_dict.items():
-            # Dùng regex sub để thay thế chính xác từ (word boundary)
-            try:
-                processed_text = re.sub(pattern, replacement, processed_text)
-            except:
-                pass
-        return processed_text
+
+        # Một lần quét cho mọi pattern, tra dict theo group vừa khớp
+        return pattern.sub(lambda m: replacements[m.lastgroup], processed_text)
 
     def run(self):
+        """Stage phát: lấy job đã tổng hợp sẵn theo thứ tự và phát"""
         if not TTS_AVAILABLE:
             print("gTTS or pygame not installed")
             return
@@ -106,249 +757,940 @@ class TTSThread(QThread):
             logging.error(f"TTS Thread Error: {e}")
             return
 
+        # Stage dịch chạy trên thread riêng, stage tổng hợp chạy trên network loop (hoặc pool prefetch riêng)
+        if self.network is None:
+            self._synth_pool = ThreadPoolExecutor(max_workers=self.prefetch_depth, thread_name_prefix='tts-synth')
+        translate_thread = threading.Thread(target=self._translate_stage, name='tts-translate', daemon=True)
+        translate_thread.start()
 
+        while self.running:
+            self.mutex.lock()
+            while self.running and not (self._ready and (
+                    self._ready[0].future.done()
+                    or time.monotonic() - self._ready[0].created > self.SYNTH_TIMEOUT)):
+                # Thức dậy định kỳ để không chờ mãi một câu bị kẹt
+                self.cond.wait(self.mutex, 1000)
+            if not self.running:
+                self.mutex.unlock()
+                break
+            job = self._ready.popleft()
+            self.mutex.unlock()
 
+            try:
+                if job.generation == self.generation and self.enabled and not job.future.cancelled():
+                    audio = job.future.result(timeout=0)
+                    self.play(audio, job.generation)
+            except FutureTimeoutError:
+                job.future.cancel()
+                logging.warning(f"TTS synthesis timed out after {self.SYNTH_TIMEOUT:.0f}s: {job.text}")
+                print(f"TTS timeout, skipping: {job.text}")
+            except Exception as e:
+                print(f"TTS Error: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                self._release_slot()
 
+        if self._synth_pool is not None:
+            self._synth_pool.shutdown(wait=False, cancel_futures=True)
 
+    def _translate_stage(self):
+        """Stage dịch: dịch theo batch các text trong queue, đẩy sang pool tổng hợp khi còn chỗ prefetch"""
+        translated = deque() # (text_to_speak, lang_code, generation) đã dịch, chờ slot prefetch
         while self.running:
             self.mutex.lock()
-            if not self.queue:
+            while self.running and not (
+                    (translated and self._in_flight < self.prefetch_depth + 1)
+                    or (not translated and self.queue)):
                 self.cond.wait(self.mutex)
-            
-            if not self.queue:
+            if not self.running:
+                self.mutex.unlock()
+                break
+
+            if translated:
+                text_to_speak, lang_code, generation = translated.popleft()
+                if generation != self.generation:
+                    # Queue đã bị flush trong lúc dịch
+                    self.mutex.unlock()
+                    continue
+                self._in_flight += 1
+                print(f"Generating TTS for: {text_to_speak}")
+                if self.network is not None:
+                    future = self.network.call_blocking(self.synthesize, text_to_speak, lang_code)
+                else:
+                    future = self._synth_pool.submit(self.synthesize, text_to_speak, lang_code)
+                self._ready.append(TTSJob(text_to_speak, lang_code, generation, future))
                 self.mutex.unlock()
+                # Đánh thức stage phát khi tổng hợp xong
+                future.add_done_callback(lambda _: self._wake())
                 continue
-                
-            text = self.queue.pop(0)
+
+            # Khi dịch, gộp nhiều tin đang chờ thành một request
+            batch_size = self.translate_batch_size if self.translate_enabled else 1
+            texts = [item.text for item in self.queue.take(max(1, batch_size))]
+            generation = self.generation
             self.mutex.unlock()
-            
-            if self.enabled and text:
+            if not texts:
+                # Toàn bộ tin trong queue đã quá hạn
+                continue
+
+            lang_code = 'vi' if (self.translate_enabled and self.translate_to_vi) else 'en'
+            # Nếu disable translate thì có thể cần detect lang, nhưng tạm thời mặc định
+            # Logic cũ: translate enabled -> vi. 
+            # Logic mới: translate enabled -> vi or en.
+            # Nếu không translate thì đọc nguyên bản (thường là tiếng Việt nếu stream Việt?)
+            # Để đơn giản: nếu translate=off, mặc định đọc tiếng Việt (gTTS support auto detect kém)
+            # Hoặc ta cứ để 'vi' nếu ko translate, user nói tiếng anh thì nó đọc hơi dở.
+            for text_to_speak in self.prepare_texts(texts):
+                translated.append((text_to_speak, lang_code, generation))
+
+    def _wake(self):
+        self.mutex.lock()
+        self.cond.wakeAll()
+        self.mutex.unlock()
+
+    def _release_slot(self):
+        self.mutex.lock()
+        self._in_flight -= 1
+        self.cond.wakeAll()
+        self.mutex.unlock()
+
+    def prepare_text(self, text):
+        """Xử lý dịch thuật nếu được bật, trả về câu sẽ đọc"""
+        return self.prepare_texts([text])[0]
+
+    def prepare_texts(self, texts):
+        """Dịch một batch (một request cho các câu chưa có trong cache), lỗi thì đọc nguyên bản"""
+        if not self.translate_enabled:
+            return list(texts)
+        try:
+            # 1. Expand Slang trước (quan trọng!)
+            preprocessed = [self.expand_slang(text) for text in texts]
+
+            # 2. Dịch qua Translator (cache + batch)
+            dest_lang = 'vi' if self.translate_to_vi else 'en'
+            if self.network is not None:
+                future = self.network.call_blocking(self.translator.translate_many, preprocessed, dest_lang)
                 try:
-                    text_to_speak = text
-                    
-                    # Xử lý dịch thuật nếu được bật
-                    if self.translate_enabled:
-                        try:
-                            # 1. Expand Slang trước (quan trọng!)
-                            preprocessed_text = self.expand_slang(text)
-                            if preprocessed_text != text.lower():
-                                logging.debug(f"Slang expanded: '{text}' -> '{preprocessed_text}'")
-
-                            # 2. Dịch bằng mtranslate
-                            dest_lang = 'vi' if self.translate_to_vi else 'en'
-                            translated_text = google_translate(preprocessed_text, dest_lang, 'auto')
-                            logging.debug(f"Translated: '{text}' -> '{translated_text}'")
-                            print(f"DEBUG: Translated '{preprocessed_text}' -> '{translated_text}'")
-                            
-                            if translated_text:
-                                text_to_speak = translated_text
-                                
-                        except Exception as te:
-                            logging.error(f"Translation Error: {te}")
-                            print(f"Translation Error: {te}")
-                            # Fallback: đọc nguyên bản
-
-                    # Tạo tên file unique theo timestamp để tránh lỗi file đang busy
-                    filename = f"tts_{int(time.time()*1000)}.mp3"
-
-                    filename = os.path.abspath(filename)
-                    
-                    print(f"Generating TTS for: {text_to_speak}")
-                    lang_code = 'vi' if (self.translate_enabled and self.translate_to_vi) else 'en'
-                    # Nếu disable translate thì có thể cần detect lang, nhưng tạm thời mặc định
-                    # Logic cũ: translate enabled -> vi. 
-                    # Logic mới: translate enabled -> vi or en.
-                    # Nếu không translate thì đọc nguyên bản (thường là tiếng Việt nếu stream Việt?)
-                    # Để đơn giản: nếu translate=off, mặc định đọc tiếng Việt (gTTS support auto detect kém)
-                    # Hoặc ta cứ để 'vi' nếu ko translate, user nói tiếng anh thì nó đọc hơi dở.
-                    
-                    tts = gTTS(text=text_to_speak, lang=lang_code, slow=False)
-                    tts.save(filename)
-                    
-                    # Play sound
-                    pygame.mixer.music.load(filename)
-                    # Set volume (0.0 to 1.0)
-                    pygame.mixer.music.set_volume(self.volume)
-                    pygame.mixer.music.play()
-                    
-                    # Wait for playback to finish
-                    while pygame.mixer.music.get_busy():
-                        pygame.time.Clock().tick(10)
-                        if not self.running:
-                            pygame.mixer.music.stop()
-                            break
-                    
-                    # Unload to delete
-                    pygame.mixer.music.unload()
-                    
-                    # Delete temp file
-                    try:
-                        os.remove(filename)
-                    except:
-                        pass
-                        
-                except Exception as e:
-                    print(f"TTS Error: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    translated = future.result(timeout=self.TRANSLATE_TIMEOUT)
+                except FutureTimeoutError:
+                    future.cancel()
+                    raise FutureTimeoutError(f"dịch quá {self.TRANSLATE_TIMEOUT:.0f}s") from None
+            else:
+                translated = self.translator.translate_many(preprocessed, dest_lang)
+            for text, translated_text in zip(preprocessed, translated):
+                logging.debug(f"Translated: '{text}' -> '{translated_text}'")
+            print(f"DEBUG: Translated {len(texts)} message(s), cache {self.translator.stats()['hit_rate']:.0%}")
+
+            # Fallback: đọc nguyên bản nếu kết quả rỗng
+            return [translated_text or text for text, translated_text in zip(texts, translated)]
+                
+        except Exception as te:
+            logging.error(f"Translation Error: {te}")
+            print(f"Translation Error: {te}")
+            # Fallback: đọc nguyên bản
+        return list(texts)
+
+    def synthesize(self, text, lang_code):
+        """Tổng hợp giọng nói vào bộ nhớ (không ghi file tạm), dùng cache nếu đã có
+
+        Engine online lỗi/timeout thì chuyển sang engine offline nếu bật fallback.
+        """
+        backend = self.backends.get(self.engine)
+        if backend is None or not backend.available():
+            backend = next((b for b in self.backends.values() if b.available()), None)
+            if backend is None:
+                raise RuntimeError("No TTS engine available")
+
+        try:
+            return self._synthesize_with(backend, text, lang_code)
+        except Exception as e:
+            fallback = self.backends.get(self.fallback_engine)
+            if not (self.fallback_enabled and backend.network and fallback is not None
+                    and fallback is not backend and fallback.available()):
+                raise
+            logging.warning(f"TTS engine {backend.name} failed ({e}), falling back to {fallback.name}")
+            print(f"TTS engine {backend.name} failed ({e}), using {fallback.name}")
+            return self._synthesize_with(fallback, text, lang_code)
+
+    def _synthesize_with(self, backend, text, lang_code):
+        key = TTSAudioCache.make_key(text, lang_code, self.slow, backend.name)
+        audio = self.audio_cache.get(key)
+        if audio is None:
+            audio = backend.synthesize(text, lang_code, self.slow)
+            if self.keep_pcm:
+                # Giải mã ngay trên pool prefetch để cache tính cả PCM
+                audio.decode()
+            self.audio_cache.put(key, audio)
+        return audio
+
+    def play(self, audio, generation):
+        """Phát audio trong RAM trên một channel, ngủ đến khi phát xong hoặc bị skip/stop"""
+        # Giải mã thành PCM (pygame Sound); keep_pcm thì giữ lại để lần sau không phải giải mã
+        had_pcm = audio.sound is not None
+        sound = audio.decode()
+        if not had_pcm:
+            self.audio_cache.recount(audio)
+        sound.set_volume(self.volume)
+
+        self._skip_event.clear()
+        if not self.running or generation != self.generation:
+            return
+        channel = sound.play()
+
+        # Wait for playback to finish: ngủ theo độ dài audio, skip/stop/flush sẽ đánh thức ngay
+        end = time.monotonic() + sound.get_length()
+        while channel is not None and channel.get_busy():
+            if self._skip_event.wait(max(0.01, end - time.monotonic())):
+                channel.stop()
+                break
+
+        if not self.keep_pcm:
+            audio.release_pcm()
+            self.audio_cache.recount(audio)
+
+    def skip_current(self):
+        """Bỏ qua câu đang đọc"""
+        self._skip_event.set()
     
-    def add_text(self, text):
+    def configure_queue(self, policy, maxlen, max_age, sample_every=3):
+        """Cập nhật giới hạn và chính sách quá tải của hàng đợi"""
+        self.mutex.lock()
+        if policy in TTSQueue.POLICIES:
+            self.queue.policy = policy
+        self.queue.maxlen = max(1, maxlen)
+        self.queue.max_age = max_age
+        self.queue.sample_every = max(1, sample_every)
+        # Hàng đợi đang dài hơn giới hạn mới thì bỏ bớt tin thường cũ nhất
+        self.queue.trim()
+        self.mutex.unlock()
+
+    def add_text(self, text, is_member=False, is_superchat=False):
         if not self.enabled:
             return
         self.mutex.lock()
-        self.queue.append(text)
-        self.cond.wakeOne()
+        if self.queue.push(TTSQueueItem(text, is_member, is_superchat)):
+            self.cond.wakeAll()
         self.mutex.unlock()
 
+    def flush(self):
+        """Xoá queue, huỷ các job đang prefetch và dừng câu đang đọc"""
+        self.mutex.lock()
+        self.queue.clear()
+        self.generation += 1
+        pending = list(self._ready)
+        self.cond.wakeAll()
+        self.mutex.unlock()
+        # Huỷ ngoài mutex vì done-callback của future cũng lock mutex
+        for job in pending:
+            job.future.cancel()
+        self._skip_event.set()
+
     def stop(self):
         self.running = False
-        self.cond.wakeOne()
+        self.flush()
         self.wait()
 
 
 
-class ChatMessage(QWidget):
-    """Widget cho một tin nhắn chat với animation"""
-    def __init__(self, author, message, timestamp, config, is_member=False, is_superchat=False, sc_amount=""):
+def parse_css_color(value, default='#ffffff'):
+    """Chuyển màu dạng CSS ('#rrggbb' hoặc 'rgba(r, g, b, a)') sang QColor"""
+    match = re.match(r'\s*rgba?\(([^)]*)\)', value or '')
+    if match:
+        parts = [p.strip() for p in match.group(1).split(',')]
+        try:
+            r, g, b = (int(float(p)) for p in parts[:3])
+            a = int(float(parts[3])) if len(parts) > 3 else 255
+            return QColor(r, g, b, a)
+        except ValueError:
+            return QColor(default)
+    color = QColor(value or default)
+    return color if color.isValid() else QColor(default)
 
-        super().__init__()
-        
-        # Main layout - horizontal để text chạy liền mạch
-        main_layout = QHBoxLayout()
-        main_layout.setContentsMargins(12, 8, 12, 8)
-        main_layout.setSpacing(6)
-        
-        # Determine styles based on type
-        msg_bg = config.get('msg_bg_color', 'rgba(255, 255, 255, 10)')
-        border_color = config.get('accent_color', '#6366f1')
-        author_color = config.get('author_color', '#6366f1')
-        
-        if is_superchat:
-            msg_bg = 'rgba(218, 165, 32, 40)' # Golden background
-            border_color = '#FFD700' # Gold border
-            author_color = '#FFD700'
-        elif is_member:
-            author_color = '#34D399' # Emerald Green for members
-            border_color = '#34D399'
-
-        # Tạo text liền mạch
-        full_text = ""
-        if config.get('show_timestamp', True):
-            full_text += f"<span style='color: {config.get('time_color', '#888888')};'>{timestamp}</span> "
-        
-        # Prefix for Member/SC
-        prefix = ""
-        if is_superchat:
-            prefix = f"<span style='color: #FFD700; font-weight: bold;'>[SC {sc_amount}] </span>"
-        elif is_member:
-            prefix = "<span style='color: #34D399; font-weight: bold;'>[Member] </span>"
-            
-        if config.get('show_author', True):
-            full_text += f"{prefix}<span style='color: {author_color}; font-weight: 600;'>{author}:</span> "
-        else:
-             full_text += f"{prefix}"
-
-        full_text += f"<span style='color: {config.get('message_color', '#ffffff')};'>{message}</span>"
-        
-        # Label với rich text
-        self.message_label = QLabel(full_text)
-        self.message_label.setWordWrap(True)
-        self.message_label.setTextFormat(Qt.RichText)
-        self.message_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: {config.get('font_size', 14)}px;
-                padding: 6px 10px;
-                background-color: {msg_bg};
-                border-radius: {config.get('border_radius', 6)}px;
-                border-left: 3px solid {border_color};
-            }}
-        """)
-        
-        main_layout.addWidget(self.message_label)
-        self.setLayout(main_layout)
-        
-        # Animation - slide in from left
-        self.setMaximumHeight(0)
-        self.animation = QPropertyAnimation(self, b"maximumHeight")
-        self.animation.setDuration(config.get('animation_speed', 300))
-        self.animation.setStartValue(0)
-        self.animation.setEndValue(100)
-        self.animation.setEasingCurve(QEasingCurve.OutCubic)
-        
-        
-        # Opacity animation
-        self.opacity_effect = QGraphicsOpacityEffect(self)
-        self.opacity_effect.setOpacity(1.0)
-        self.setGraphicsEffect(self.opacity_effect)
-        
-        # Timeout timer
-        self.timeout_timer = None
-        timeout = config.get('message_timeout', 0)
-        if timeout > 0:
-            self.timeout_timer = QTimer()
-            self.timeout_timer.setSingleShot(True)
-            self.timeout_timer.timeout.connect(self.start_fade_out)
-            self.timeout_timer.start(timeout * 1000)
-            
-    def start_fade_out(self):
-        """Start fade out animation then close"""
-        self.anim_opacity = QPropertyAnimation(self.opacity_effect, b"opacity")
-        self.anim_opacity.setDuration(1000) # 1 second fade out
-        self.anim_opacity.setStartValue(1.0)
-        self.anim_opacity.setEndValue(0.0)
-        self.anim_opacity.finished.connect(self.deleteLater)
-        self.anim_opacity.start()
-        
-    def show_animated(self):
-        """Show with animation"""
-        self.animation.start()
-        
-    def enterEvent(self, event):
-        """Pause timeout on hover"""
-        if self.timeout_timer and self.timeout_timer.isActive():
-            self.timeout_timer.stop()
-        super().enterEvent(event)
-        
-    def leaveEvent(self, event):
-        """Resume timeout on leave"""
-        if self.timeout_timer:
-            self.timeout_timer.start() # Restart full duration
-        super().leaveEvent(event)
 
+class ChatMessage:
+    """Bản ghi gọn nhẹ cho một tin nhắn chat (được vẽ bởi ChatMessageDelegate)"""
+    __slots__ = ('author', 'message', 'timestamp', 'is_member', 'is_superchat', 'sc_amount', 'source',
+                 'sent_at', 'count', 'seq', 'created', 'expires_at', 'fade_start', 'height', 'size_key')
 
-class SettingsPanel(QWidget):
-    """Panel cài đặt nâng cao"""
-    def __init__(self, parent=None):
+    def __init__(self, author, message, timestamp, is_member=False, is_superchat=False, sc_amount="", source="",
+                 sent_at=None):
+        self.author = author
+        self.message = message
+        self.timestamp = timestamp
+        self.is_member = is_member
+        self.is_superchat = is_superchat
+        self.sc_amount = sc_amount
+        self.source = source # Nhãn nguồn khi kết nối nhiều livestream ("" = một nguồn)
+        self.sent_at = sent_at # timestamp YouTube (epoch giây), None với tin System/demo
+        self.count = 1 # Số lần tin giống hệt được gộp vào dòng này (×N)
+        self.created = time.monotonic()
+        self.expires_at = None  # None = không tự biến mất (hoặc đang hover)
+        self.fade_start = None
+        self.seq = -1 # Vị trí trong ChatHistory (gán khi thêm vào lịch sử)
+        self.height = 0 # Chiều cao dòng đã đo, hợp lệ khi size_key khớp (độ rộng, style, font, ×N)
+        self.size_key = None
+
+
+class ChatHistory:
+    """Ring buffer bản ghi tin nhắn: dung lượng cố định, truy cập theo dòng O(1)
+
+    Đầy thì bản ghi cũ nhất bị đè. Mỗi bản ghi mang seq tăng dần nên tìm dòng không cần quét.
+    """
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self._buf = [None] * self.capacity
+        self._head = 0
+        self._len = 0
+        self.first_seq = 0 # seq của dòng 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, row):
+        if not 0 <= row < self._len:
+            raise IndexError(row)
+        return self._buf[(self._head + row) % self.capacity]
+
+    def __iter__(self):
+        for row in range(self._len):
+            yield self._buf[(self._head + row) % self.capacity]
+
+    def append(self, record):
+        """Thêm vào cuối; gọi drop_front trước nếu đầy"""
+        record.seq = self.first_seq + self._len
+        self._buf[(self._head + self._len) % self.capacity] = record
+        self._len += 1
+
+    def drop_front(self, count):
+        """Bỏ count bản ghi cũ nhất, trả về danh sách đã bỏ"""
+        count = min(count, self._len)
+        dropped = [self[row] for row in range(count)]
+        for row in range(count):
+            self._buf[(self._head + row) % self.capacity] = None
+        self._head = (self._head + count) % self.capacity
+        self._len -= count
+        self.first_seq += count
+        return dropped
+
+    def clear(self):
+        self._buf = [None] * self.capacity
+        self._head = 0
+        self._len = 0
+
+    def resize(self, capacity):
+        """Đổi dung lượng, giữ lại các bản ghi mới nhất"""
+        records = list(self)[-max(1, capacity):]
+        self.capacity = max(1, capacity)
+        self._buf = records + [None] * (self.capacity - len(records))
+        self._head = 0
+        self.first_seq += self._len - len(records)
+        self._len = len(records)
+
+
+class ChatListModel(QAbstractListModel):
+    """Model các tin đang hiện trên overlay - chỉ giữ dòng chưa hết hạn
+
+    QListView layout lại mọi dòng mỗi lần thêm/xoá nên tin hết hạn bị xoá khỏi model
+    (vẫn còn trong ChatHistoryModel để xem lại bằng 📜); không hết hạn thì giữ tối đa MAX_ROWS dòng.
+    """
+    MessageRole = Qt.UserRole + 1
+    FADE_DURATION = 1.0  # giây, giống animation mờ dần cũ
+    MAX_ROWS = 200
+    # Dòng first..last cần vẽ lại (animation). Không dùng dataChanged: QListView layout lại toàn bộ
+    rows_repaint = pyqtSignal(int, int)
+
+    def __init__(self, config, parent=None):
         super().__init__(parent)
-        self.setWindowFlags(Qt.Popup)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: rgba(10, 10, 15, 250);
-                border-radius: 12px;
-                border: 1px solid rgba(99, 102, 241, 50);
-            }
-            QLabel {
-                color: white;
-                font-size: 12px;
-                font-weight: 500;
-            }
-            QLineEdit {
-                background-color: rgba(255, 255, 255, 15);
-                border: 1px solid rgba(255, 255, 255, 30);
-                border-radius: 6px;
-                padding: 8px;
-                color: white;
-                font-size: 12px;
-            }
-            QLineEdit:focus {
-                border: 1px solid #6366f1;
-                background-color: rgba(255, 255, 255, 20);
-            }
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #6366f1, stop:1 #4f46e5);
-                border: none;
-                border-radius: 6px;
+        self.config = config
+        self.records = [] # Bản ghi đang hiện, seq tăng dần
+        self._seqs = [] # seq của từng dòng (bisect tìm dòng)
+        self._active = set() # Dòng đang slide-in / mờ dần
+
+        # Frame tick chung cho mọi animation, chỉ chạy khi _active khác rỗng
+        self.tick_timer = QTimer(self)
+        self.tick_timer.setInterval(1000 // config.get('render_fps', 30))
+        self.tick_timer.timeout.connect(self.tick)
+
+        # Heap (expires_at, seq, record) + một timer single-shot tới hạn sớm nhất
+        self._expiry = []
+        self._expiry_seq = 0
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.setSingleShot(True)
+        self.expiry_timer.timeout.connect(self.on_expiry)
+
+    def record(self, row):
+        return self.records[row]
+
+    def row_of(self, record):
+        row = bisect.bisect_left(self._seqs, record.seq)
+        if row < len(self.records) and self.records[row] is record:
+            return row
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.records)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.records):
+            return None
+        record = self.records[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{record.author}: {record.message}"
+        if role == self.MessageRole:
+            return record
+        return None
+
+    def append(self, record):
+        """Thêm tin nhắn vào cuối danh sách"""
+        self.append_many([record])
+
+    def append_many(self, records, animate=True):
+        """Thêm nhiều tin nhắn (đã có seq trong ChatHistory) với một lần insert
+
+        animate=False: hiện ngay, không slide-in (khi đang dồn nhiều tin).
+        """
+        if not records:
+            return
+        records = records[-self.MAX_ROWS:]
+
+        # Đầy: bỏ các dòng cũ nhất trước khi thêm
+        overflow = len(self.records) + len(records) - self.MAX_ROWS
+        if overflow > 0:
+            self._remove_rows(0, overflow - 1)
+
+        row = len(self.records)
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self.records.extend(records)
+        self._seqs.extend(record.seq for record in records)
+        self.endInsertRows()
+
+        timeout = self.config.get('message_timeout', 0)
+        anim_duration = self.config.get('animation_speed', 300) / 1000.0
+        animate = animate and anim_duration > 0
+        now = time.monotonic()
+        for record in records:
+            # Tính slide-in/timeout từ lúc hiện lên (tin có thể đã chờ vài frame)
+            record.created = now if animate else now - anim_duration
+            if timeout > 0:
+                self._schedule_expiry(record, now + timeout)
+            if animate:
+                self._active.add(record)
+        self._start_frames()
+
+    def _remove_rows(self, first, last):
+        self.beginRemoveRows(QModelIndex(), first, last)
+        for record in self.records[first:last + 1]:
+            self._active.discard(record)
+        del self.records[first:last + 1]
+        del self._seqs[first:last + 1]
+        self.endRemoveRows()
+
+    def remove_records(self, records):
+        """Tin hết hạn: xoá khỏi overlay (vẫn còn trong ChatHistory), mỗi đoạn dòng liền nhau một lần remove"""
+        rows = sorted({row for row in map(self.row_of, records) if row is not None}, reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self._remove_rows(first, last)
+
+    def touch(self, record):
+        """Tin lặp lại được gộp vào dòng: tính lại timeout, trả về index để vẽ lại (ChatMessageDelegate.update_row)
+
+        Trả về None nếu dòng không còn trong danh sách hoặc đang mờ dần.
+        """
+        if record.fade_start is not None:
+            return None
+        row = self.row_of(record)
+        if row is None:
+            return None
+        timeout = self.config.get('message_timeout', 0)
+        if timeout > 0 and record.expires_at is not None:
+            self._schedule_expiry(record, time.monotonic() + timeout)
+        return self.index(row)
+
+    def clear(self):
+        self.beginResetModel()
+        self.records.clear()
+        self._seqs.clear()
+        self.endResetModel()
+        self._active.clear()
+        self._expiry.clear()
+        self.tick_timer.stop()
+        self.expiry_timer.stop()
+
+    def pause_expiry(self, record):
+        """Hover vào tin nhắn: tạm dừng đếm ngược (entry trong heap bị bỏ qua)"""
+        if record.fade_start is None:
+            record.expires_at = None
+
+    def resume_expiry(self, record):
+        """Rời chuột: đếm lại từ đầu như QTimer.start() cũ"""
+        timeout = self.config.get('message_timeout', 0)
+        if timeout > 0 and record.fade_start is None and self.row_of(record) is not None:
+            self._schedule_expiry(record, time.monotonic() + timeout)
+
+    def _schedule_expiry(self, record, expires_at):
+        record.expires_at = expires_at
+        self._expiry_seq += 1
+        heapq.heappush(self._expiry, (expires_at, self._expiry_seq, record))
+        # Entry cũ (hover/touch) chỉ bị bỏ khi tới hạn - dọn bớt nếu heap phình to
+        if len(self._expiry) > 4 * max(64, len(self.records)):
+            self._expiry = [entry for entry in self._expiry
+                            if entry[2].expires_at == entry[0] and self.row_of(entry[2]) is not None]
+            heapq.heapify(self._expiry)
+        self._arm_expiry_timer()
+
+    def _arm_expiry_timer(self):
+        """Hẹn giờ single-shot tới hạn sớm nhất trong heap"""
+        while self._expiry and self._expiry[0][2].expires_at != self._expiry[0][0]:
+            heapq.heappop(self._expiry) # Đã bị hover/touch thay đổi
+        if not self._expiry:
+            self.expiry_timer.stop()
+            return
+        delay = max(0, int((self._expiry[0][0] - time.monotonic()) * 1000) + 1)
+        self.expiry_timer.start(delay)
+
+    def on_expiry(self):
+        """Các tin tới hạn bắt đầu mờ dần"""
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, _, record = heapq.heappop(self._expiry)
+            if record.expires_at != expires_at or record.fade_start is not None or self.row_of(record) is None:
+                continue
+            record.fade_start = now
+            self._active.add(record)
+        self._start_frames()
+        self._arm_expiry_timer()
+
+    def _start_frames(self):
+        if self._active and not self.tick_timer.isActive():
+            self.tick_timer.start()
+
+    def tick(self):
+        """Frame tick - chỉ chạy khi có dòng đang slide-in hoặc mờ dần, chỉ vẽ lại các dòng đó"""
+        now = time.monotonic()
+        anim_duration = self.config.get('animation_speed', 300) / 1000.0
+        finished = []
+        changed = []
+        for record in list(self._active):
+            if record.fade_start is not None:
+                if now - record.fade_start >= self.FADE_DURATION:
+                    finished.append(record)
+                    continue
+            elif now - record.created >= anim_duration:
+                self._active.discard(record) # Slide-in xong, vẽ khung cuối
+            changed.append(record)
+
+        self.remove_records(finished)
+
+        rows = [row for row in map(self.row_of, changed) if row is not None]
+        if rows:
+            self.rows_repaint.emit(min(rows), max(rows))
+        if not self._active:
+            self.tick_timer.stop()
+
+
+    def opacity(self, record, now=None):
+        """Độ mờ hiện tại của dòng (slide-in và fade-out)"""
+        now = time.monotonic() if now is None else now
+        if record.fade_start is not None:
+            return max(0.0, 1.0 - (now - record.fade_start) / self.FADE_DURATION)
+        return self.slide_progress(record, now)
+
+    def slide_progress(self, record, now=None):
+        """Tiến độ animation slide-in, 0..1 với easing OutCubic"""
+        now = time.monotonic() if now is None else now
+        duration = self.config.get('animation_speed', 300) / 1000.0
+        if duration <= 0:
+            return 1.0
+        t = min(1.0, (now - record.created) / duration)
+        return 1.0 - (1.0 - t) ** 3
+
+
+class ChatHistoryModel(QAbstractListModel):
+    """Lịch sử tin nhắn (ring buffer) cho chế độ xem lại 📜
+
+    Chỉ gắn vào QListView khi đang bật 📜. Tin mới vào ChatHistory ngay (gán seq) nhưng view chỉ được
+    báo thêm/bớt dòng tối đa mỗi FLUSH_INTERVAL_MS một lần: mỗi lần như vậy QListView layout lại
+    toàn bộ lịch sử. Giữa hai lần flush, dòng của view ánh xạ theo seq (dòng đã bị đè -> None).
+    Mọi dòng vẽ đầy đủ, không animation.
+    """
+    MessageRole = ChatListModel.MessageRole
+    FLUSH_INTERVAL_MS = 1000
+
+    def __init__(self, capacity=2000, parent=None):
+        super().__init__(parent)
+        self.records = ChatHistory(capacity)
+        self._first = 0 # seq của dòng 0 mà view đang biết
+        self._rows = 0 # Số dòng view đang biết
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    @property
+    def capacity(self):
+        return self.records.capacity
+
+    def set_capacity(self, capacity):
+        if capacity == self.records.capacity:
+            return
+        self.beginResetModel()
+        self.records.resize(capacity)
+        self._sync()
+        self.endResetModel()
+
+    def _sync(self):
+        self._first = self.records.first_seq
+        self._rows = len(self.records)
+
+    def record(self, row):
+        """Bản ghi ở dòng row của view, None nếu đã bị đè (chờ flush)"""
+        offset = self._first + row - self.records.first_seq
+        return self.records[offset] if 0 <= offset < len(self.records) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < self._rows:
+            return None
+        record = self.record(index.row())
+        if record is None:
+            return None
+        if role == Qt.DisplayRole:
+            return f"{record.author}: {record.message}"
+        if role == self.MessageRole:
+            return record
+        return None
+
+    def append_many(self, records):
+        """Thêm vào lịch sử (gán seq ngay), đầy thì đè các bản ghi cũ nhất; view cập nhật ở lần flush sau"""
+        if not records:
+            return
+        records = records[-self.capacity:]
+        overflow = len(self.records) + len(records) - self.capacity
+        if overflow > 0:
+            self.records.drop_front(overflow)
+        for record in records:
+            self.records.append(record)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Báo view các dòng đã bị đè (đầu) và dòng mới (cuối) - một lần layout"""
+        self.flush_timer.stop()
+        dropped = min(self.records.first_seq - self._first, self._rows)
+        if dropped > 0:
+            self.beginRemoveRows(QModelIndex(), 0, dropped - 1)
+            self._first += dropped
+            self._rows -= dropped
+            self.endRemoveRows()
+        if self._rows == 0:
+            self._first = self.records.first_seq
+        added = self.records.first_seq + len(self.records) - (self._first + self._rows)
+        if added > 0:
+            self.beginInsertRows(QModelIndex(), self._rows, self._rows + added - 1)
+            self._rows += added
+            self.endInsertRows()
+
+    def index_of(self, record):
+        row = record.seq - self._first
+        if 0 <= row < self._rows and self.record(row) is record:
+            return self.index(row)
+        return None
+
+    def clear(self):
+        self.flush_timer.stop()
+        self.beginResetModel()
+        self.records.clear()
+        self._sync()
+        self.endResetModel()
+
+    def opacity(self, record, now=None):
+        return 1.0
+
+    def slide_progress(self, record, now=None):
+        return 1.0
+
+
+class ChatStyle:
+    """Style tin nhắn biên dịch sẵn, dùng chung cho mọi dòng
+
+    Mỗi loại tin (normal/member/superchat) có màu nền/viền (QColor) và template HTML với màu chữ
+    điền sẵn bằng <font color> (không dùng stylesheet: QTextDocument phải parse lại CSS cho từng dòng).
+    Chỉ biên dịch lại khi các key giao diện trong config thay đổi (version tăng).
+    """
+    KEYS = ('show_timestamp', 'show_author', 'author_color', 'time_color', 'message_color',
+            'accent_color', 'msg_bg_color')
+    MEMBER_COLOR = '#34D399' # Emerald Green for members
+    SUPERCHAT_COLOR = '#FFD700' # Gold
+    SUPERCHAT_BG = 'rgba(218, 165, 32, 40)' # Golden background
+
+    def __init__(self):
+        self.version = 0
+        self._key = None
+        self.templates = {} # kind -> template str.format
+        self.source_template = ""
+        self.count_template = ""
+        self.colors = {} # kind -> (nền, viền) QColor
+
+    @staticmethod
+    def html_color(value, default='#ffffff'):
+        """Màu CSS -> giá trị cho <font color> ('#rrggbb', hoặc '#aarrggbb' nếu có alpha)"""
+        color = parse_css_color(value, default)
+        return color.name(QColor.HexArgb if color.alpha() < 255 else QColor.HexRgb)
+
+    @staticmethod
+    def kind(record):
+        if record.is_superchat:
+            return 'superchat'
+        if record.is_member:
+            return 'member'
+        return 'normal'
+
+    def compile(self, config):
+        """Biên dịch lại template nếu config giao diện đổi, trả về True nếu có thay đổi"""
+        key = tuple(config.get(name) for name in self.KEYS)
+        if key == self._key:
+            return False
+        self._key = key
+
+        time_color = config.get('time_color', '#888888')
+        author_color = config.get('author_color', '#6366f1')
+        accent_color = config.get('accent_color', '#6366f1')
+        msg_bg = config.get('msg_bg_color', 'rgba(255, 255, 255, 10)')
+        time_font = self.html_color(time_color, '#888888')
+        accent_font = self.html_color(accent_color, '#6366f1')
+        message_font = self.html_color(config.get('message_color', '#ffffff'))
+        self.source_template = f"<font color='{time_font}'>[{{}}] </font>"
+        self.count_template = f" <font color='{accent_font}'><b>×{{}}</b></font>"
+
+        # Chỗ trống theo vị trí (format theo vị trí nhanh hơn theo tên):
+        # 0 giờ, 1 nguồn, 2 số tiền SC, 3 tác giả, 4 nội dung, 5 ×N
+        head = f"<font color='{time_font}'>{{0}}</font> " if config.get('show_timestamp', True) else ""
+        tags = {
+            'normal': "",
+            'member': f"<font color='{self.MEMBER_COLOR}'><b>[Member] </b></font>",
+            'superchat': f"<font color='{self.SUPERCHAT_COLOR}'><b>[SC {{2}}] </b></font>",
+        }
+        author_colors = {
+            'normal': self.html_color(author_color, '#6366f1'),
+            'member': self.MEMBER_COLOR,
+            'superchat': self.SUPERCHAT_COLOR,
+        }
+        for kind, tag in tags.items():
+            template = head + "{1}" + tag
+            if config.get('show_author', True):
+                template += (f"<font color='{author_colors[kind]}'>"
+                             "<span style='font-weight:600'>{3}:</span></font> ")
+            template += f"<font color='{message_font}'>{{4}}</font>{{5}}"
+            self.templates[kind] = template
+
+        self.colors = {
+            'normal': (parse_css_color(msg_bg), parse_css_color(accent_color)),
+            'member': (parse_css_color(msg_bg), QColor(self.MEMBER_COLOR)),
+            'superchat': (parse_css_color(self.SUPERCHAT_BG), QColor(self.SUPERCHAT_COLOR)),
+        }
+        self.version += 1
+        return True
+
+    def render(self, record):
+        """Rich text của một tin nhắn (chỉ điền dữ liệu vào template)"""
+        return self.templates[self.kind(record)].format(
+            record.timestamp,
+            self.source_template.format(html.escape(record.source)) if record.source else "",
+            html.escape(record.sc_amount) if record.is_superchat else "",
+            html.escape(record.author),
+            html.escape(record.message),
+            self.count_template.format(record.count) if record.count > 1 else "",
+        )
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """Vẽ tin nhắn chat trực tiếp bằng QPainter, cùng giao diện với widget cũ
+
+    Chiều cao dòng được đo một lần (bằng một QTextDocument dùng lại) và lưu trên bản ghi;
+    QTextDocument riêng của từng dòng chỉ được dựng khi vẽ (dòng đang hiển thị).
+    """
+    ROW_MARGIN_X = 12
+    ROW_MARGIN_Y = 10  # 8px margin + nửa khoảng cách 4px giữa các dòng như layout cũ
+    PADDING_X = 10
+    PADDING_Y = 6
+    BORDER_WIDTH = 3
+    SLIDE_DISTANCE = 40
+    CACHE_SIZE = 256
+
+    def __init__(self, config, view):
+        super().__init__(view)
+        self.config = config
+        self.view = view
+        self.style = ChatStyle()
+        self.style.compile(config)
+        self._font = None
+        self._font_key = None
+        self._doc_cache = OrderedDict()
+        self._measure_doc = None
+
+    def invalidate(self):
+        """Biên dịch lại style theo config, xoá cache nếu giao diện thay đổi (trả về True)"""
+        font_key = self.config.get('font_size', 14)
+        changed = self.style.compile(self.config) or font_key != self._font_key
+        if changed:
+            self._font_key = font_key
+            self._font = None
+            self._doc_cache.clear()
+            self._measure_doc = None
+        return changed
+
+    def message_styles(self, record):
+        """Trả về (nền, màu viền) QColor theo loại tin nhắn"""
+        return self.style.colors[ChatStyle.kind(record)]
+
+    def message_html(self, record):
+        """Tạo rich text cho một tin nhắn"""
+        return self.style.render(record)
+
+    def _text_width(self, width):
+        return max(20, width - 2 * self.ROW_MARGIN_X - self.BORDER_WIDTH - 2 * self.PADDING_X)
+
+    def _document(self, record, width):
+        """QTextDocument đã layout cho dòng, cache theo bản ghi, độ rộng và số lần gộp"""
+        key = id(record)
+        cached = self._doc_cache.get(key)
+        if cached is not None and cached[0] is record and cached[1] == width and cached[3] == record.count:
+            self._doc_cache.move_to_end(key)
+            return cached[2]
+
+        doc = self._new_document()
+        doc.setHtml(self.message_html(record))
+        doc.setTextWidth(self._text_width(width))
+
+        self._doc_cache[key] = (record, width, doc, record.count)
+        if len(self._doc_cache) > self.CACHE_SIZE:
+            self._doc_cache.popitem(last=False)
+        return doc
+
+    def _new_document(self):
+        if self._font is None:
+            self._font = QFont(self.view.font())
+            self._font.setPixelSize(self.config.get('font_size', 14))
+        doc = QTextDocument()
+        doc.setDefaultFont(self._font)
+        doc.setDocumentMargin(0)
+        return doc
+
+    def _row_height(self, record, width):
+        """Chiều cao dòng, chỉ đo lại khi độ rộng/style/font/×N đổi"""
+        size_key = (width, self.style.version, self._font_key, record.count)
+        if record.size_key != size_key:
+            if self._measure_doc is None:
+                self._measure_doc = self._new_document()
+            doc = self._measure_doc
+            doc.setTextWidth(self._text_width(width))
+            doc.setHtml(self.message_html(record))
+            record.height = int(doc.size().height()) + 2 * self.PADDING_Y + 2 * self.ROW_MARGIN_Y
+            record.size_key = size_key
+        return record.height
+
+    def _row_width(self, option):
+        return self.view.viewport().width() or option.rect.width()
+
+    def update_row(self, index):
+        """Nội dung dòng đổi (×N): chỉ layout lại khi chiều cao đổi, không thì chỉ vẽ lại dòng"""
+        record = index.model().record(index.row())
+        if record is None:
+            return
+        if record.size_key is None or record.height != self._row_height(record, record.size_key[0]):
+            self.sizeHintChanged.emit(index)
+        else:
+            self.view.update(index)
+
+    def sizeHint(self, option, index):
+        # Gọi cho mọi dòng mỗi lần layout: lấy thẳng bản ghi, không qua data()
+        record = index.model().record(index.row())
+        width = self._row_width(option)
+        if record is None:
+            return QSize(width, 0) # Lịch sử: bản ghi đã bị đè, chờ flush
+        return QSize(width, self._row_height(record, width))
+
+    def paint(self, painter, option, index):
+        record = index.data(ChatListModel.MessageRole) # ChatListModel hoặc ChatHistoryModel
+        if record is None:
+            return
+        model = index.model()
+        now = time.monotonic()
+        opacity = model.opacity(record, now)
+        if opacity <= 0:
+            return
+
+        msg_bg, border_color = self.message_styles(record)
+        width = self._row_width(option)
+        doc = self._document(record, width)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setOpacity(opacity)
+
+        # Slide in from left
+        offset = -self.SLIDE_DISTANCE * (1.0 - model.slide_progress(record, now))
+        bubble = QRectF(option.rect).adjusted(self.ROW_MARGIN_X + offset, self.ROW_MARGIN_Y,
+                                              -self.ROW_MARGIN_X + offset, -self.ROW_MARGIN_Y)
+        radius = self.config.get('border_radius', 6)
+        path = QPainterPath()
+        path.addRoundedRect(bubble, radius, radius)
+        painter.fillPath(path, msg_bg)
+
+        # Viền trái
+        painter.setClipPath(path)
+        painter.fillRect(QRectF(bubble.left(), bubble.top(), self.BORDER_WIDTH, bubble.height()), border_color)
+        painter.setClipping(False)
+
+        painter.translate(bubble.left() + self.BORDER_WIDTH + self.PADDING_X, bubble.top() + self.PADDING_Y)
+        doc.drawContents(painter)
+        painter.restore()
+
+
+class SettingsPanel(QWidget):
+    """Panel cài đặt nâng cao"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.Popup)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: rgba(10, 10, 15, 250);
+                border-radius: 12px;
+                border: 1px solid rgba(99, 102, 241, 50);
+            }
+            QLabel {
+                color: white;
+                font-size: 12px;
+                font-weight: 500;
+            }
+            QLineEdit {
+                background-color: rgba(255, 255, 255, 15);
+                border: 1px solid rgba(255, 255, 255, 30);
+                border-radius: 6px;
+                padding: 8px;
+                color: white;
+                font-size: 12px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #6366f1;
+                background-color: rgba(255, 255, 255, 20);
+            }
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                    stop:0 #6366f1, stop:1 #4f46e5);
+                border: none;
+                border-radius: 6px;
                 padding: 8px;
                 color: white;
                 font-size: 12px;
@@ -432,7 +1774,7 @@ class SettingsPanel(QWidget):
         
         layout.addWidget(QLabel("URL Channel hoặc Video YouTube:"))
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("https://www.youtube.com/@channel hoặc /watch?v=...")
+        self.url_input.setPlaceholderText("https://www.youtube.com/@channel hoặc /watch?v=... (nhiều link: cách nhau bởi dấu phẩy)")
         layout.addWidget(self.url_input)
         
         # Auto-detect live button
@@ -451,6 +1793,11 @@ class SettingsPanel(QWidget):
         """)
         layout.addWidget(self.detect_live_btn)
 
+        self.detect_status_label = QLabel("")
+        self.detect_status_label.setStyleSheet("color: #aaaaaa; font-size: 11px;")
+        self.detect_status_label.setWordWrap(True)
+        self.detect_status_label.hide()
+        layout.addWidget(self.detect_status_label)
         
         # === APPEARANCE SECTION ===
         section2 = QLabel("🎨 Giao diện")
@@ -527,6 +1874,37 @@ class SettingsPanel(QWidget):
         self.anim_slider.valueChanged.connect(self.update_anim_label)
         layout.addWidget(self.anim_slider)
         
+        # FPS vẽ tin nhắn
+        fps_layout = QHBoxLayout()
+        fps_layout.addWidget(QLabel("FPS hiển thị:"))
+        self.fps_value = QLabel("30")
+        fps_layout.addWidget(self.fps_value)
+        layout.addLayout(fps_layout)
+        
+        self.fps_slider = QSlider(Qt.Horizontal)
+        self.fps_slider.setMinimum(10)
+        self.fps_slider.setMaximum(60)
+        self.fps_slider.setValue(30)
+        self.fps_slider.valueChanged.connect(lambda value: self.fps_value.setText(str(value)))
+        layout.addWidget(self.fps_slider)
+        
+        # Số tin giữ trong lịch sử
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QLabel("Lịch sử tin nhắn:"))
+        self.history_value = QLabel("2000")
+        history_layout.addWidget(self.history_value)
+        layout.addLayout(history_layout)
+        
+        self.history_slider = QSlider(Qt.Horizontal)
+        self.history_slider.setMinimum(100)
+        # Lịch sử chỉ được layout khi bật 📜 (~8us/dòng, tối đa mỗi giây một lần lúc đang xem)
+        self.history_slider.setMaximum(20000)
+        self.history_slider.setSingleStep(100)
+        self.history_slider.setPageStep(1000)
+        self.history_slider.setValue(2000)
+        self.history_slider.valueChanged.connect(lambda value: self.history_value.setText(str(value)))
+        layout.addWidget(self.history_slider)
+        
         # === COLOR SECTION ===
         section3 = QLabel("🌈 Màu sắc")
         section3.setStyleSheet("font-size: 13px; font-weight: 600; margin-top: 12px; color: #8b5cf6;")
@@ -570,6 +1948,19 @@ class SettingsPanel(QWidget):
         self.tts_cb = QCheckBox("Bật đọc tin nhắn")
         self.tts_cb.setChecked(False)
         layout.addWidget(self.tts_cb)
+
+        engine_layout = QHBoxLayout()
+        engine_layout.addWidget(QLabel("Giọng đọc:"))
+        self.tts_engine_combo = QComboBox()
+        for backend in (GTTSBackend(), EspeakBackend()):
+            label = backend.label if backend.available() else f"{backend.label} - chưa cài"
+            self.tts_engine_combo.addItem(label, backend.name)
+        engine_layout.addWidget(self.tts_engine_combo)
+        layout.addLayout(engine_layout)
+
+        self.tts_fallback_cb = QCheckBox("Tự dùng giọng offline khi mạng lỗi/chậm")
+        self.tts_fallback_cb.setChecked(True)
+        layout.addWidget(self.tts_fallback_cb)
         
         self.translate_cb = QCheckBox("🌐 Chế độ dịch (Translate)")
         self.translate_cb.setStyleSheet("color: #8b5cf6; margin-left: 20px;")
@@ -593,11 +1984,18 @@ class SettingsPanel(QWidget):
         trans_layout.addWidget(self.rb_en_vi)
         trans_layout.addWidget(self.rb_vi_en)
         layout.addLayout(trans_layout)
+
+        self.translate_batch_cb = QCheckBox("Dịch gộp nhiều tin một lần (khi chat nhanh)")
+        self.translate_batch_cb.setStyleSheet("color: white; margin-left: 20px;")
+        self.translate_batch_cb.setChecked(True)
+        layout.addWidget(self.translate_batch_cb)
         
         # Toggle translation options visibility
-        self.translate_cb.toggled.connect(lambda c: self.rb_en_vi.setVisible(c) or self.rb_vi_en.setVisible(c))
+        self.translate_cb.toggled.connect(lambda c: self.rb_en_vi.setVisible(c) or self.rb_vi_en.setVisible(c)
+                                          or self.translate_batch_cb.setVisible(c))
         self.rb_en_vi.setVisible(False)
         self.rb_vi_en.setVisible(False)
+        self.translate_batch_cb.setVisible(False)
 
         
         vol_layout = QHBoxLayout()
@@ -614,6 +2012,57 @@ class SettingsPanel(QWidget):
         vol_layout.addWidget(self.tts_vol_value)
         vol_layout.addWidget(self.tts_vol_value)
         layout.addLayout(vol_layout)
+
+        self.tts_keep_pcm_cb = QCheckBox("Giữ âm thanh đã giải mã (PCM) trong RAM")
+        self.tts_keep_pcm_cb.setChecked(False)
+        layout.addWidget(self.tts_keep_pcm_cb)
+
+        self.tts_disk_cache_cb = QCheckBox("Lưu cache giọng đọc ra đĩa (tts_cache/)")
+        self.tts_disk_cache_cb.setChecked(False)
+        layout.addWidget(self.tts_disk_cache_cb)
+
+        # Hàng đợi đọc khi chat quá nhanh
+        policy_layout = QHBoxLayout()
+        policy_layout.addWidget(QLabel("Khi hàng đợi đầy:"))
+        self.tts_policy_combo = QComboBox()
+        for label, policy in (("Bỏ tin cũ nhất", 'drop_oldest'),
+                              ("Bỏ tin mới đến", 'drop_newest'),
+                              ("Chỉ đọc Super Chat/Member", 'paid_only'),
+                              ("Đọc 1 trong N tin", 'sample'),
+                              ("Gộp tin trùng", 'coalesce')):
+            self.tts_policy_combo.addItem(label, policy)
+        policy_layout.addWidget(self.tts_policy_combo)
+        layout.addLayout(policy_layout)
+
+        queue_layout = QHBoxLayout()
+        queue_layout.addWidget(QLabel("Số tin chờ tối đa:"))
+        self.tts_queue_value = QLabel("50")
+        queue_layout.addWidget(self.tts_queue_value)
+        layout.addLayout(queue_layout)
+
+        self.tts_queue_slider = QSlider(Qt.Horizontal)
+        self.tts_queue_slider.setMinimum(5)
+        self.tts_queue_slider.setMaximum(200)
+        self.tts_queue_slider.setValue(50)
+        self.tts_queue_slider.valueChanged.connect(lambda v: self.tts_queue_value.setText(str(v)))
+        layout.addWidget(self.tts_queue_slider)
+
+        age_layout = QHBoxLayout()
+        age_layout.addWidget(QLabel("Bỏ tin chờ lâu hơn:"))
+        self.tts_age_value = QLabel("60s")
+        age_layout.addWidget(self.tts_age_value)
+        layout.addLayout(age_layout)
+
+        self.tts_age_slider = QSlider(Qt.Horizontal)
+        self.tts_age_slider.setMinimum(0)
+        self.tts_age_slider.setMaximum(300)
+        self.tts_age_slider.setValue(60)
+        self.tts_age_slider.valueChanged.connect(self.update_tts_age_label)
+        layout.addWidget(self.tts_age_slider)
+
+        self.tts_stats_label = QLabel("")
+        self.tts_stats_label.setStyleSheet("color: #aaaaaa; font-size: 11px;")
+        layout.addWidget(self.tts_stats_label)
         
         # === FILTER SECTION ===
         section6 = QLabel("🛡️ Bộ lọc từ cấm (Blacklist)")
@@ -636,6 +2085,31 @@ class SettingsPanel(QWidget):
         """)
         layout.addWidget(self.blacklist_edit)
 
+        self.blacklist_fold_cb = QCheckBox("Bỏ qua dấu khi lọc (co bac = cờ bạc)")
+        self.blacklist_fold_cb.setChecked(False)
+        layout.addWidget(self.blacklist_fold_cb)
+
+        self.coalesce_cb = QCheckBox("Gộp tin nhắn spam giống nhau (×N)")
+        self.coalesce_cb.setChecked(True)
+        layout.addWidget(self.coalesce_cb)
+
+        self.archive_cb = QCheckBox("Lưu trữ chat ra đĩa (chat_archive.db)")
+        self.archive_cb.setChecked(True)
+        layout.addWidget(self.archive_cb)
+
+        self.archive_search_btn = QPushButton("🔎 Tìm trong lưu trữ chat")
+        self.archive_search_btn.setStyleSheet("""
+            QPushButton {
+                 background-color: rgba(99, 102, 241, 50);
+                 border: 1px solid rgba(99, 102, 241, 100);
+                 color: white;
+                 border-radius: 4px;
+                 padding: 4px;
+            }
+            QPushButton:hover { background-color: rgba(99, 102, 241, 80); }
+        """)
+        layout.addWidget(self.archive_search_btn)
+
         
         # Test voice button
         self.test_voice_btn = QPushButton("🔊 Test Giọng Đọc")
@@ -719,125 +2193,1095 @@ class SettingsPanel(QWidget):
     def update_anim_label(self, value):
         self.anim_value.setText(f"{value}ms")
 
+    def update_tts_age_label(self, value):
+        if value == 0:
+            self.tts_age_value.setText("Không")
+        else:
+            self.tts_age_value.setText(f"{value}s")
+
+
+
+class ConnectDialog(QDialog):
+    """Dialog nhập URL custom đẹp hơn"""
+    def __init__(self, parent=None, current_url=""):
+        super().__init__(parent)
+        self.setWindowTitle("Kết nối YouTube Chat")
+        self.setFixedSize(420, 200) # Increased size
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.Dialog)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        # Main container with style
+        container = QWidget()
+        container.setStyleSheet("""
+            QWidget {
+                background-color: rgba(15, 15, 25, 250);
+                border: 1px solid rgba(99, 102, 241, 80);
+                border-radius: 12px;
+            }
+            QLabel {
+                color: white;
+                background: transparent;
+                border: none;
+            }
+            QLineEdit {
+                background-color: rgba(255, 255, 255, 10);
+                border: 1px solid rgba(255, 255, 255, 20);
+                border-radius: 6px;
+                padding: 10px;
+                color: white;
+                font-size: 13px;
+                min-height: 20px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #6366f1;
+                background-color: rgba(255, 255, 255, 15);
+            }
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                    stop:0 #6366f1, stop:1 #4f46e5);
+                border: none;
+                border-radius: 6px;
+                padding: 8px 16px; 
+                min-height: 25px;
+                color: white;
+                font-weight: 600;
+                font-size: 13px;
+            }
+            QPushButton:hover {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                    stop:0 #4f46e5, stop:1 #4338ca);
+            }
+            QPushButton#cancel {
+                background: transparent;
+                border: 1px solid rgba(255, 255, 255, 30);
+            }
+            QPushButton#cancel:hover {
+                background: rgba(255, 255, 255, 10);
+            }
+        """)
+        
+        inner_layout = QVBoxLayout(container)
+        inner_layout.setContentsMargins(20, 20, 20, 20)
+        inner_layout.setSpacing(15)
+        
+        # Title
+        title = QLabel("🔗 Kết nối Livestream")
+        title.setStyleSheet("font-size: 16px; font-weight: 700; color: #8b5cf6;")
+        inner_layout.addWidget(title)
+        
+        # Label instruction
+        lbl = QLabel("Nhập Link Video hoặc Kênh YouTube:")
+        lbl.setStyleSheet("color: #cccccc; font-size: 12px;")
+        inner_layout.addWidget(lbl)
+        
+        # Input
+        self.url_input = QLineEdit()
+        self.url_input.setText(current_url)
+        self.url_input.setPlaceholderText("https://youtube.com/...")
+        self.url_input.setFocus()
+        inner_layout.addWidget(self.url_input)
+        
+        # Buttons
+        btn_layout = QHBoxLayout()
+        self.btn_cancel = QPushButton("Bỏ qua")
+        self.btn_cancel.setObjectName("cancel")
+        self.btn_cancel.clicked.connect(self.reject)
+        
+        self.btn_ok = QPushButton("Kết nối ngay")
+        self.btn_ok.clicked.connect(self.accept)
+        # Default button
+        self.btn_ok.setDefault(True)
+        
+        btn_layout.addWidget(self.btn_cancel)
+        btn_layout.addWidget(self.btn_ok)
+        inner_layout.addLayout(btn_layout)
+        
+        layout.addWidget(container)
+        self.setLayout(layout)
+        
+    def get_url(self):
+        return self.url_input.text().strip()
+
+class ArchiveSearchDialog(QDialog):
+    """Tìm trong lưu trữ chat (truy vấn chạy trên network loop, không chặn UI)"""
+    TIME_RANGES = [
+        ("Mọi lúc", None),
+        ("1 giờ qua", 3600),
+        ("24 giờ qua", 86400),
+        ("7 ngày qua", 7 * 86400),
+        ("30 ngày qua", 30 * 86400),
+    ]
+    RESULT_LIMIT = 500
+
+    def __init__(self, archive, network, parent=None):
+        super().__init__(parent)
+        self.archive = archive
+        self.network = network
+        self.task = None
+        self.setWindowTitle("Tìm trong lưu trữ chat")
+        self.resize(520, 480)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: rgba(15, 15, 25, 250);
+            }
+            QLabel, QCheckBox {
+                color: white;
+                font-size: 12px;
+            }
+            QLineEdit, QComboBox, QTextEdit {
+                background-color: rgba(255, 255, 255, 10);
+                border: 1px solid rgba(255, 255, 255, 20);
+                border-radius: 6px;
+                padding: 6px;
+                color: white;
+                font-size: 12px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #6366f1;
+            }
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                    stop:0 #6366f1, stop:1 #4f46e5);
+                border: none;
+                border-radius: 6px;
+                padding: 8px 16px;
+                color: white;
+                font-weight: 600;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(8)
+
+        self.text_input = QLineEdit()
+        self.text_input.setPlaceholderText("Nội dung (mọi từ đều phải có)")
+        self.text_input.returnPressed.connect(self.run_search)
+        layout.addWidget(self.text_input)
+
+        filter_layout = QHBoxLayout()
+        self.author_input = QLineEdit()
+        self.author_input.setPlaceholderText("Tên người gửi")
+        self.author_input.returnPressed.connect(self.run_search)
+        filter_layout.addWidget(self.author_input)
+
+        self.range_combo = QComboBox()
+        for label, _ in self.TIME_RANGES:
+            self.range_combo.addItem(label)
+        filter_layout.addWidget(self.range_combo)
+        layout.addLayout(filter_layout)
+
+        action_layout = QHBoxLayout()
+        self.superchat_cb = QCheckBox("Chỉ Super Chat")
+        action_layout.addWidget(self.superchat_cb)
+        action_layout.addStretch()
+        self.search_btn = QPushButton("🔎 Tìm")
+        self.search_btn.clicked.connect(self.run_search)
+        action_layout.addWidget(self.search_btn)
+        layout.addLayout(action_layout)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #888888; font-size: 11px;")
+        layout.addWidget(self.status_label)
+
+        self.results_view = QTextEdit()
+        self.results_view.setReadOnly(True)
+        layout.addWidget(self.results_view)
+
+    def run_search(self):
+        if self.task is not None:
+            self.task.cancel()
+        seconds = self.TIME_RANGES[self.range_combo.currentIndex()][1]
+        query = {
+            'author': self.author_input.text(),
+            'text': self.text_input.text(),
+            'superchat_only': self.superchat_cb.isChecked(),
+            'since': time.time() - seconds if seconds else None,
+            'limit': self.RESULT_LIMIT,
+        }
+        self.status_label.setText("Đang tìm...")
+        started = time.perf_counter()
+        self.task = self.network.submit(
+            # Đọc SQLite có thể chờ khoá/writer: không giữ chỗ của request mạng
+            self.network.run_waiting(self.archive.search, **query),
+            lambda future: self.show_results(future, started),
+        )
+
+    def show_results(self, future, started):
+        if future is not self.task:
+            return # Kết quả của lần tìm cũ
+        self.task = None
+        try:
+            rows = future.result()
+        except Exception as e:
+            self.status_label.setText(f"❌ Lỗi tìm kiếm: {e}")
+            return
+
+        lines = []
+        for row in rows:
+            when = datetime.fromtimestamp(row['sent_at']).strftime("%d/%m %H:%M:%S")
+            prefix = ""
+            if row['is_superchat']:
+                prefix = f"<span style='color: #FFD700; font-weight: bold;'>[SC {html.escape(row['amount'] or '')}]</span> "
+            elif row['is_member']:
+                prefix = "<span style='color: #34D399; font-weight: bold;'>[Member]</span> "
+            lines.append(
+                f"<span style='color: #888888;'>{when}</span> {prefix}"
+                f"<span style='color: #6366f1; font-weight: 600;'>{html.escape(row['author'])}:</span> "
+                f"<span style='color: #ffffff;'>{html.escape(row['message'])}</span>"
+            )
+        self.results_view.setHtml("<br>".join(lines))
+        more = "+" if len(rows) >= self.RESULT_LIMIT else ""
+        self.status_label.setText(f"{len(rows)}{more} kết quả ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def closeEvent(self, event):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        super().closeEvent(event)
+
+
+class NetworkLoop(QObject):
+    """Một asyncio event loop trên thread riêng, sở hữu toàn bộ network I/O
+
+    - submit(coro, callback): chạy coroutine trên loop; callback(future) được gọi ở UI thread
+    - run_blocking(func, ...): (trong coroutine) chạy hàm blocking (requests, pytchat, gTTS...)
+      trên executor giới hạn max_concurrency luồng
+    - call_blocking(func, ...): như run_blocking nhưng gọi được từ thread khác, trả về Future
+    - run_waiting(func, ...): hàm có thể chờ rất lâu (pytchat get() chờ tin mới) - chạy trên
+      executor riêng, không chiếm slot max_concurrency của các request ngắn
+    """
+    MAX_WAITING = 16 # Số lời gọi run_waiting chạy cùng lúc (mỗi nguồn chat đồng bộ một lời gọi)
+
+    result_ready = pyqtSignal(object, object) # callback, concurrent.futures.Future
+
+    def __init__(self, max_concurrency=4, parent=None):
+        super().__init__(parent)
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='net')
+        self.loop.set_default_executor(self._executor)
+        self._wait_executor = ThreadPoolExecutor(max_workers=self.MAX_WAITING, thread_name_prefix='net-wait')
+        self._semaphore = None
+        self._thread = threading.Thread(target=self._run, name='network-loop', daemon=True)
+        # Qt tự chuyển signal sang UI thread (queued connection)
+        self.result_ready.connect(self._deliver)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.loop.run_forever()
+        # Huỷ các task còn lại trước khi đóng loop
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def submit(self, coro, callback=None):
+        """Chạy coroutine trên network loop (gọi từ thread bất kỳ)"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback is not None:
+            future.add_done_callback(lambda f: self.result_ready.emit(callback, f))
+        return future
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Chạy hàm blocking trên executor, giới hạn số request đồng thời"""
+        async with self._semaphore:
+            return await self.loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    def call_blocking(self, func, *args, **kwargs):
+        return self.submit(self.run_blocking(func, *args, **kwargs))
+
+    async def run_waiting(self, func, *args, **kwargs):
+        """Chạy hàm blocking có thể chờ vô thời hạn, không qua semaphore"""
+        return await self.loop.run_in_executor(self._wait_executor, functools.partial(func, *args, **kwargs))
+
+    def _deliver(self, callback, future):
+        if future.cancelled():
+            return
+        callback(future)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._wait_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LiveChatSource:
+    """Nguồn chat pytchat cho asyncio
+
+    Ưu tiên pytchat.LiveChatAsync (chạy thẳng trên network loop, không tạo thread);
+    không có thì dùng pytchat.create đồng bộ và gọi get() qua run_waiting (get() chờ tới khi có tin).
+    """
+    def __init__(self, network, video_id):
+        self.network = network
+        self.video_id = video_id
+        self.chat = None
+        self.is_async = False
+
+    async def open(self):
+        if hasattr(pytchat, 'LiveChatAsync'):
+            try:
+                self.chat = pytchat.LiveChatAsync(
+                    self.video_id,
+                    topchat_only=False, # Lấy tất cả tin nhắn
+                    interruptable=False # Không cài signal handler (không phải main thread)
+                )
+                self.is_async = True
+                return
+            except Exception as e:
+                logging.warning(f"LiveChatAsync unavailable ({e}), falling back to pytchat.create")
+
+        # Thêm tham số logger để debug nếu cần, và thử tắt topchat_only
+        # seek_time=0 để đảm bảo bắt đầu từ hiện tại
+        self.chat = await self.network.run_blocking(
+            pytchat.create,
+            video_id=self.video_id,
+            topchat_only=False, # Lấy tất cả tin nhắn
+            interruptable=False
+        )
+
+    def is_alive(self):
+        return self.chat is not None and self.chat.is_alive()
+
+    async def get_items(self):
+        """Một trang get() của pytchat: (items, giây server yêu cầu chờ trước lần lấy sau hoặc None)"""
+        if self.is_async:
+            data = await self.chat.get()
+        else:
+            data = await self.network.run_waiting(self.chat.get)
+        if not data:
+            return [], None
+        return data.items, getattr(data, 'interval', None)
+
+    def error(self):
+        """Lỗi làm stream dừng, None nếu livestream kết thúc bình thường"""
+        if self.chat is None:
+            return None
+        try:
+            self.chat.raise_for_status()
+        except Exception as e:
+            # pytchat báo livestream đã kết thúc bằng ChatDataFinished
+            if type(e).__name__ == 'ChatDataFinished':
+                return None
+            return e
+        return None
+
+    def terminate(self):
+        if self.chat is not None:
+            try:
+                self.chat.terminate()
+            except Exception:
+                pass
+
+
+class AdaptivePoller:
+    """Khoảng nghỉ giữa các lần get() theo độ bận của chat
+
+    Trang rỗng -> giãn dần (x BACKOFF) tới max_interval; trang đầy (>= full_page tin) -> rút
+    ngắn (x TIGHTEN) tới min_interval; trang thường -> quay dần về base_interval.
+    Khoảng chờ server trả về (timeoutMs của YouTube) là mức tối thiểu.
+    """
+    BACKOFF = 1.5
+    TIGHTEN = 0.5
+    RATE_WINDOW = 60.0 # giây, cửa sổ tính số lần poll/phút
+
+    def __init__(self, base_interval=0.5, min_interval=0.1, max_interval=2.0, full_page=20):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_page = full_page
+        self.interval = base_interval
+        self._polls = deque() # monotonic time các lần poll trong RATE_WINDOW
+
+    def update(self, count, server_interval=None):
+        """Ghi nhận một trang có count tin, trả về số giây nghỉ trước lần poll sau"""
+        now = time.monotonic()
+        self._polls.append(now)
+        while self._polls and now - self._polls[0] > self.RATE_WINDOW:
+            self._polls.popleft()
+
+        if count == 0:
+            interval = self.interval * self.BACKOFF
+        elif count >= self.full_page:
+            interval = self.interval * self.TIGHTEN
+        else:
+            interval = (self.interval + self.base_interval) / 2
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+        if server_interval:
+            self.interval = max(self.interval, server_interval)
+        return self.interval
+
+    def polls_per_minute(self):
+        if len(self._polls) < 2:
+            return 0.0
+        span = self._polls[-1] - self._polls[0]
+        return (len(self._polls) - 1) * 60.0 / span if span > 0 else 0.0
+
+
+class LatencyStats:
+    """Độ trễ end-to-end (timestamp YouTube -> hiện trên overlay) của các tin gần nhất"""
+    def __init__(self, maxlen=500):
+        self.samples = deque(maxlen=maxlen)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def clear(self):
+        self.samples.clear()
+
+    def stats(self):
+        if not self.samples:
+            return {'count': 0, 'avg': 0.0, 'p95': 0.0}
+        ordered = sorted(self.samples)
+        return {
+            'count': len(ordered),
+            'avg': sum(ordered) / len(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        }
+
+
+class RecentIds:
+    """Tập ID tin nhắn gần nhất (giới hạn maxlen, bỏ ID cũ nhất) để loại tin trùng"""
+    def __init__(self, maxlen=5000):
+        self.maxlen = maxlen
+        self._order = deque()
+        self._ids = set()
+
+    def add(self, item_id):
+        """Thêm ID, trả về False nếu ID đã có"""
+        if item_id in self._ids:
+            return False
+        self._ids.add(item_id)
+        self._order.append(item_id)
+        if len(self._order) > self.maxlen:
+            self._ids.discard(self._order.popleft())
+        return True
+
+    def clear(self):
+        self._order.clear()
+        self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class MessageFilter:
+    """Lọc giữa fetch và hiển thị: bỏ tin trùng ID, gộp tin spam giống hệt nhau
+
+    Tin có cùng nội dung (không phân biệt hoa thường/khoảng trắng) lặp lại trong `window` giây
+    kể từ lần gặp cuối được cộng vào dòng cũ (×N) thay vì tạo dòng và job TTS mới.
+    Bộ nhớ cố định: tối đa max_ids ID và max_texts nội dung.
+    """
+    def __init__(self, window=10.0, max_ids=5000, max_texts=1000):
+        self.window = window
+        self.enabled = True # Gộp spam
+        self.ids = RecentIds(max_ids)
+        self.max_texts = max_texts
+        self._recent = OrderedDict() # text key -> [record, last_seen], cũ nhất ở đầu
+        self.duplicates = 0
+        self.coalesced = 0
+
+    def is_duplicate(self, message_id):
+        if message_id and not self.ids.add(message_id):
+            self.duplicates += 1
+            return True
+        return False
+
+    @staticmethod
+    def text_key(message):
+        return ' '.join(message.casefold().split())
+
+    def match(self, message, now):
+        """Dòng đang hiển thị có cùng nội dung trong cửa sổ thời gian, hoặc None"""
+        if not self.enabled:
+            return None
+        self._expire(now)
+        entry = self._recent.get(self.text_key(message))
+        if entry is None:
+            return None
+        return entry[0]
+
+    def remember(self, message, record, now):
+        if not self.enabled:
+            return
+        key = self.text_key(message)
+        self._recent[key] = [record, now]
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_texts:
+            self._recent.popitem(last=False)
+
+    def coalesce(self, message, record, now):
+        """Ghi nhận một lần lặp: tăng ×N và kéo dài cửa sổ"""
+        record.count += 1
+        self.coalesced += 1
+        self.remember(message, record, now)
+
+    def _expire(self, now):
+        # last_seen tăng dần theo thứ tự trong OrderedDict nên chỉ cần xét đầu danh sách
+        while self._recent:
+            entry = next(iter(self._recent.values()))
+            if now - entry[1] <= self.window:
+                break
+            self._recent.popitem(last=False)
+
+    def clear(self):
+        self.ids.clear()
+        self._recent.clear()
+
+
+CHAT_ARCHIVE_FILE = 'chat_archive.db'
+
+
+class ChatArchive:
+    """Lưu trữ chat append-only (SQLite WAL) + tìm kiếm theo tác giả, nội dung, Super Chat, thời gian
+
+    add() chỉ bỏ batch vào hàng đợi (không bao giờ chặn UI/network loop); một thread riêng gom lại
+    và commit theo lô BATCH_SIZE tin hoặc mỗi FLUSH_INTERVAL giây. Nội dung được đánh chỉ mục FTS5,
+    SQLite không có FTS5 thì tìm bằng LIKE.
+    """
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 1.0 # giây
+    QUEUE_BATCHES = 1000 # Hàng đợi đầy (đĩa quá chậm) thì bỏ batch mới
+    _STOP = object()
+
+    def __init__(self, path=CHAT_ARCHIVE_FILE):
+        self.path = path
+        self.enabled = True
+        self.fts = False
+        self.error = None
+        self.written = 0
+        self.dropped = 0
+        self._stats_lock = threading.Lock() # written/dropped: add() (network loop) và writer thread
+        self._queue = queue.Queue(maxsize=self.QUEUE_BATCHES)
+        self._thread = threading.Thread(target=self._run, name='chat-archive', daemon=True)
+        self._ready = threading.Event() # Schema đã tạo xong
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        """Ghi nốt hàng đợi rồi dừng writer"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout=5)
+
+    def add(self, video_id, batch):
+        """Ghi một batch tin (author, message, is_member, is_sc, amount, sent_at, source, id) - gọi từ thread bất kỳ"""
+        if not self.enabled or self.error is not None or not batch:
+            return
+        now = time.time()
+        rows = [(sent_at or now, video_id, source, msg_id or None, author, message,
+                 int(bool(is_member)), int(bool(is_superchat)), amount or None)
+                for author, message, is_member, is_superchat, amount, sent_at, source, msg_id in batch]
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += len(rows)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL: mất điện chỉ mất vài commit cuối, không hỏng file
+        return conn
+
+    def _create_schema(self, conn):
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY,
+                    sent_at REAL NOT NULL,
+                    video_id TEXT,
+                    source TEXT,
+                    msg_id TEXT,
+                    author TEXT NOT NULL COLLATE NOCASE,
+                    message TEXT NOT NULL,
+                    is_member INTEGER NOT NULL DEFAULT 0,
+                    is_superchat INTEGER NOT NULL DEFAULT 0,
+                    amount TEXT
+                );
+                CREATE INDEX IF NOT EXISTS messages_sent_at ON messages(sent_at);
+                CREATE INDEX IF NOT EXISTS messages_author ON messages(author, sent_at);
+                CREATE INDEX IF NOT EXISTS messages_superchat ON messages(sent_at) WHERE is_superchat;
+                CREATE UNIQUE INDEX IF NOT EXISTS messages_msg_id ON messages(msg_id) WHERE msg_id IS NOT NULL;
+            """)
+        try:
+            with conn:
+                conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+                        USING fts5(message, content='messages', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                        INSERT INTO messages_fts(rowid, message) VALUES (new.id, new.message);
+                    END;
+                """)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Chat archive: FTS5 not available ({e}), using LIKE search")
+
+    def _run(self):
+        try:
+            conn = self._connect()
+            self._create_schema(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Chat archive: cannot open {self.path}: {e}")
+            self.error = str(e)
+            return
+        finally:
+            self._ready.set()
+
+        rows = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                break
+            if item:
+                rows.extend(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.FLUSH_INTERVAL
+            if rows and (len(rows) >= self.BATCH_SIZE or time.monotonic() >= deadline):
+                self._write(conn, rows)
+                rows = []
+                deadline = None
+
+        # Ghi nốt những gì còn trong hàng đợi
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                rows.extend(item)
+        if rows:
+            self._write(conn, rows)
+        conn.close()
+
+    def _write(self, conn, rows):
+        try:
+            with conn:
+                # Cùng msg_id (kết nối lại, mở lại app) chỉ lưu một lần
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO messages (sent_at, video_id, source, msg_id, author, message, "
+                    "is_member, is_superchat, amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            with self._stats_lock:
+                self.written += cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Chat archive: write failed ({len(rows)} rows): {e}")
+            with self._stats_lock:
+                self.dropped += len(rows)
+
+    @staticmethod
+    def _like_escape(text):
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def search(self, author="", text="", superchat_only=False, since=None, until=None, limit=500):
+        """Tìm tin đã lưu, mới nhất trước (blocking - gọi ngoài UI thread)
+
+        author: khớp đầu tên, không phân biệt hoa thường; text: mọi từ đều phải có (tiền tố).
+        Trả về list dict (sent_at, video_id, author, message, is_member, is_superchat, amount).
+        """
+        self._ready.wait(timeout=5)
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        sql, params = self._build_query(author, text, superchat_only, since, until, limit)
+
+        # Kết nối riêng cho mỗi lần tìm: WAL cho đọc song song với writer
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def _build_query(self, author, text, superchat_only, since, until, limit):
+        """Câu SELECT và tham số cho search()"""
+        where, params = [], []
+        join = ""
+        words = text.split()
+        if words and self.fts:
+            join = "JOIN messages_fts ON messages_fts.rowid = m.id"
+            where.append("messages_fts MATCH ?")
+            params.append(' '.join('"' + word.replace('"', '""') + '"*' for word in words))
+        else:
+            for word in words:
+                where.append("m.message LIKE ? ESCAPE '\\'")
+                params.append(f"%{self._like_escape(word)}%")
+        if author.strip():
+            # Cột author COLLATE NOCASE: LIKE tiền tố dùng được index
+            where.append("m.author LIKE ? ESCAPE '\\'")
+            params.append(f"{self._like_escape(author.strip())}%")
+        if superchat_only:
+            where.append("m.is_superchat")
+        if since is not None:
+            where.append("m.sent_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("m.sent_at < ?")
+            params.append(until)
+
+        sql = (f"SELECT m.sent_at, m.video_id, m.author, m.message, m.is_member, m.is_superchat, m.amount "
+               f"FROM messages m {join}")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.sent_at DESC LIMIT ?"
+        params.append(limit)
+        return sql, params
+
+
+class ChatConnectionManager:
+    """Kết nối nhiều live chat cùng lúc (mỗi video ID một coroutine trên network loop)
+
+    Tin nhắn của các nguồn được gộp trong MERGE_WINDOW giây, sắp theo timestamp YouTube rồi gửi
+    thành một batch; mỗi tin mang nhãn nguồn (#1, #2...). Chỉ một nguồn thì gửi thẳng, không nhãn.
+    """
+    MERGE_WINDOW = 0.3
+    RECONNECT_BASE = 1.0 # giây, lần thử đầu
+    RECONNECT_MAX = 60.0
+    RECONNECT_RETRIES = 8 # số lần thử liên tiếp trước khi bỏ cuộc
+
+    def __init__(self, network, on_batch, on_system, on_source_dead=None, archive=None):
+        self.network = network
+        self.on_batch = on_batch # callable(list) - phải thread-safe (emit signal)
+        self.on_system = on_system # callable(str)
+        self.on_source_dead = on_source_dead # callable(video_id): chat không sẵn sàng
+        self.archive = archive # ChatArchive: lưu mọi tin nhận được (kể cả tin bị lọc)
+        self.sources = {} # label -> LiveChatSource đang chạy
+        self.pollers = {} # label -> AdaptivePoller
+        self.received = {} # label -> số tin nhận được trong phiên kết nối hiện tại
+        self.task = None
+        self.multi = False
+        self._pending = [] # heap (sent_at, seq, item) chờ gộp
+        self._seq = 0
+
+    @property
+    def is_connected(self):
+        # Chụp lại: network loop thêm/bớt nguồn trong lúc UI thread đọc
+        return any(source.is_alive() for source in list(self.sources.values()))
+
+    def start(self, video_ids):
+        self.task = self.network.submit(self.run(video_ids))
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            # Huỷ coroutine (pytchat được terminate trong finally)
+            self.task.cancel()
+            self.task = None
+
+    def polls_per_minute(self):
+        return sum(poller.polls_per_minute() for poller in list(self.pollers.values()))
+
+    def interval(self):
+        pollers = list(self.pollers.values())
+        return min(poller.interval for poller in pollers) if pollers else 0.0
+
+    async def run(self, video_ids):
+        self.multi = len(video_ids) > 1
+        fetchers = [
+            asyncio.ensure_future(self._run_source(f"#{i}" if self.multi else "", video_id))
+            for i, video_id in enumerate(video_ids, 1)
+        ]
+        merger = asyncio.ensure_future(self._merge_loop()) if self.multi else None
+        try:
+            await asyncio.gather(*fetchers)
+        finally:
+            for task in fetchers:
+                task.cancel()
+            if merger is not None:
+                merger.cancel()
+                self._flush()
+
+    async def _run_source(self, label, video_id):
+        """Giám sát một nguồn: mất kết nối thì kết nối lại với backoff mũ + jitter
+
+        Kết nối lại, pytchat trả về một đoạn chat gần nhất - các tin đã hiện được loại theo ID.
+        """
+        name = f"{label} ({video_id})" if label else f"ID: {video_id}"
+        seen = RecentIds()
+        self.pollers[label] = AdaptivePoller()
+        attempt = 0
+        while True:
+            source = LiveChatSource(self.network, video_id)
+            error = None
+            try:
+                if attempt == 0:
+                    self.on_system(f"Đang kết nối tới {name}...")
+                print(f"DEBUG: Opening pytchat source for {video_id}")
+                await source.open()
+                print("DEBUG: pytchat source opened")
+                
+                if not source.is_alive() and attempt == 0:
+                     print("DEBUG: chat.is_alive() is False immediately")
+                     # Livestream có thể đã kết thúc - lần sau tìm lại trên trang /live
+                     if self.on_source_dead:
+                         self.on_source_dead(video_id)
+                     self.on_system(f"⚠️ Lỗi: Chat stream {name} chưa sẵn sàng hoặc Video ID không hỗ trợ chat.")
+                     # Vẫn thử để xem có may mắn không
+
+                self.sources[label] = source
+                print(f"Connected to YouTube chat: {video_id}")
+                if attempt == 0:
+                    self.on_system(f"✅ Đã kết nối {name}! Đang lấy tin nhắn...")
+                else:
+                    self.on_system(f"✅ Đã kết nối lại {name}")
+
+                self.received[label] = 0
+                await self._fetch(label, source, seen)
+                error = source.error()
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error fetching chat: {e}")
+                error = e
+            finally:
+                source.terminate()
+                self.sources.pop(label, None)
+
+            # Phiên vừa rồi đã nhận được tin (dù kết thúc bằng lỗi) -> kết nối ổn định, reset backoff
+            if self.received.pop(label, 0):
+                attempt = 0
+            if error is None:
+                self.on_system(f"Livestream {name} đã kết thúc.")
+                break
+            attempt += 1
+            if attempt > self.RECONNECT_RETRIES:
+                self.on_system(f"❌ Mất kết nối chat {name}: {str(error)} - đã thử lại {self.RECONNECT_RETRIES} lần.")
+                break
+            delay = self.reconnect_delay(attempt)
+            self.on_system(f"⚠️ Mất kết nối chat {name}: {str(error)}. Thử lại sau {delay:.0f}s ({attempt}/{self.RECONNECT_RETRIES})")
+            await asyncio.sleep(delay)
+        self.pollers.pop(label, None)
+
+    def reconnect_delay(self, attempt):
+        """Backoff mũ có trần, jitter 50-100% để các nguồn không kết nối lại cùng lúc"""
+        delay = min(self.RECONNECT_MAX, self.RECONNECT_BASE * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _fetch(self, label, source, seen):
+        """Lấy tin nhắn của một nguồn cho tới khi stream dừng
+
+        Số tin mới được cộng dồn vào self.received[label] ngay khi nhận (còn nguyên khi get() ném lỗi).
+        """
+        # Chờ một chút trước khi loop
+        await asyncio.sleep(1)
+        
+        poller = self.pollers[label]
+        while source.is_alive():
+            batch = []
+            items, server_interval = await source.get_items()
+            for chat in items:
+                # Tin đã hiện trước khi kết nối lại
+                if chat.id and not seen.add(chat.id):
+                    continue
+                author = chat.author.name
+                message = chat.message
+                
+                # Extract Metadata
+                is_member = chat.author.isChatSponsor
+                amount = chat.amountString # Not empty if superchat
+                is_superchat = bool(amount)
+                
+                # timestamp của YouTube (ms) để đo độ trễ tới lúc hiện lên overlay
+                sent_at = chat.timestamp / 1000 if chat.timestamp else None
+                batch.append((author, message, is_member, is_superchat, amount, sent_at, label, chat.id))
+            
+            if batch:
+                self.received[label] = self.received.get(label, 0) + len(batch)
+                if self.archive is not None:
+                    self.archive.add(source.video_id, batch)
+                self._push(batch)
+                
+            # Nghỉ theo độ bận của chat (không ngắn hơn timeout server): trang rỗng thì giãn, trang đầy thì rút ngắn
+            wait = poller.update(len(batch), server_interval)
+            # LiveChatAsync tự poll theo timeout của server và get() chờ buffer: không nghỉ thêm
+            if not source.is_async:
+                await asyncio.sleep(wait)
+
+    def _push(self, batch):
+        if not self.multi:
+            # Một nguồn: không cần gộp
+            self.on_batch(batch)
+            return
+        for item in batch:
+            self._seq += 1
+            heapq.heappush(self._pending, (item[5] or time.time(), self._seq, item))
+
+    async def _merge_loop(self):
+        while True:
+            await asyncio.sleep(self.MERGE_WINDOW)
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.on_batch([heapq.heappop(pending)[2] for _ in range(len(pending))])
+
 
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+}
 
-class ConnectDialog(QDialog):
-    """Dialog nhập URL custom đẹp hơn"""
-    def __init__(self, parent=None, current_url=""):
-        super().__init__(parent)
-        self.setWindowTitle("Kết nối YouTube Chat")
-        self.setFixedSize(420, 200) # Increased size
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.Dialog)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        
-        # Main container with style
-        container = QWidget()
-        container.setStyleSheet("""
-            QWidget {
-                background-color: rgba(15, 15, 25, 250);
-                border: 1px solid rgba(99, 102, 241, 80);
-                border-radius: 12px;
-            }
-            QLabel {
-                color: white;
-                background: transparent;
-                border: none;
-            }
-            QLineEdit {
-                background-color: rgba(255, 255, 255, 10);
-                border: 1px solid rgba(255, 255, 255, 20);
-                border-radius: 6px;
-                padding: 10px;
-                color: white;
-                font-size: 13px;
-                min-height: 20px;
-            }
-            QLineEdit:focus {
-                border: 1px solid #6366f1;
-                background-color: rgba(255, 255, 255, 15);
-            }
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #6366f1, stop:1 #4f46e5);
-                border: none;
-                border-radius: 6px;
-                padding: 8px 16px; 
-                min-height: 25px;
-                color: white;
-                font-weight: 600;
-                font-size: 13px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #4f46e5, stop:1 #4338ca);
-            }
-            QPushButton#cancel {
-                background: transparent;
-                border: 1px solid rgba(255, 255, 255, 30);
-            }
-            QPushButton#cancel:hover {
-                background: rgba(255, 255, 255, 10);
+
+def create_http_session(pool_size=4):
+    """requests.Session dùng chung: giữ kết nối (keep-alive), nén gzip, pool bằng số luồng network"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+
+LIVE_PAGE_CANONICAL = re.compile(rb'<link rel="canonical" href="https://www.youtube.com/watch\?v=([a-zA-Z0-9_-]{11})">')
+# Pattern dự phòng (theo thứ tự ưu tiên) khi trang không có canonical
+LIVE_PAGE_FALLBACKS = (
+    re.compile(rb'"videoId":"([a-zA-Z0-9_-]{11})"'),
+    re.compile(rb'watch\?v=([a-zA-Z0-9_-]{11})'),
+)
+LIVE_PAGE_MAX_BYTES = 4 * 1024 * 1024
+
+
+def scan_live_page(chunks, overlap=128):
+    """Tìm video ID trong trang /live khi đang tải (chunks: iterable bytes)
+
+    Dừng ngay khi gặp link canonical (nằm trong <head>, gần đầu trang). Qua hết </head>
+    mà chưa có canonical thì dừng ở match "videoId" đầu tiên. Trả về (video_id, cách tìm) hoặc (None, None).
+    """
+    tail = b''
+    past_head = False
+    fallbacks = [None] * len(LIVE_PAGE_FALLBACKS)
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Giữ lại overlap byte cuối để bắt match nằm vắt qua hai chunk
+        window = tail + chunk
+        tail = window[-overlap:]
+        read += len(chunk)
+
+        if not past_head:
+            match = LIVE_PAGE_CANONICAL.search(window)
+            if match:
+                return match.group(1).decode('ascii'), 'Canonical'
+            past_head = b'</head>' in window
+
+        for i, pattern in enumerate(LIVE_PAGE_FALLBACKS):
+            if fallbacks[i] is None:
+                match = pattern.search(window)
+                if match:
+                    fallbacks[i] = match.group(1).decode('ascii')
+
+        if past_head and fallbacks[0]:
+            break
+        if read >= LIVE_PAGE_MAX_BYTES:
+            break
+
+    for video_id in fallbacks:
+        if video_id:
+            return video_id, 'Regex'
+    return None, None
+
+
+class ChannelLiveCache:
+    """Cache channel URL -> video ID của livestream
+
+    Trong ttl giây: trả thẳng video ID, không gọi mạng. Quá ttl: entry vẫn được giữ để gửi
+    request có điều kiện (If-None-Match / If-Modified-Since); server trả 304 thì dùng lại.
+    """
+    def __init__(self, ttl=300, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # channel_url -> {'video_id', 'etag', 'last_modified', 'checked_at'}
+        self._lock = threading.Lock()
+
+    def get(self, channel_url):
+        """Trả về (entry, fresh) hoặc (None, False)"""
+        with self._lock:
+            entry = self._entries.get(channel_url)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(channel_url)
+            return dict(entry), time.monotonic() - entry['checked_at'] < self.ttl
+
+    def put(self, channel_url, video_id, etag=None, last_modified=None):
+        with self._lock:
+            self._entries[channel_url] = {
+                'video_id': video_id,
+                'etag': etag,
+                'last_modified': last_modified,
+                'checked_at': time.monotonic(),
             }
-        """)
-        
-        inner_layout = QVBoxLayout(container)
-        inner_layout.setContentsMargins(20, 20, 20, 20)
-        inner_layout.setSpacing(15)
-        
-        # Title
-        title = QLabel("🔗 Kết nối Livestream")
-        title.setStyleSheet("font-size: 16px; font-weight: 700; color: #8b5cf6;")
-        inner_layout.addWidget(title)
-        
-        # Label instruction
-        lbl = QLabel("Nhập Link Video hoặc Kênh YouTube:")
-        lbl.setStyleSheet("color: #cccccc; font-size: 12px;")
-        inner_layout.addWidget(lbl)
-        
-        # Input
-        self.url_input = QLineEdit()
-        self.url_input.setText(current_url)
-        self.url_input.setPlaceholderText("https://youtube.com/...")
-        self.url_input.setFocus()
-        inner_layout.addWidget(self.url_input)
-        
-        # Buttons
-        btn_layout = QHBoxLayout()
-        self.btn_cancel = QPushButton("Bỏ qua")
-        self.btn_cancel.setObjectName("cancel")
-        self.btn_cancel.clicked.connect(self.reject)
-        
-        self.btn_ok = QPushButton("Kết nối ngay")
-        self.btn_ok.clicked.connect(self.accept)
-        # Default button
-        self.btn_ok.setDefault(True)
-        
-        btn_layout.addWidget(self.btn_cancel)
-        btn_layout.addWidget(self.btn_ok)
-        inner_layout.addLayout(btn_layout)
-        
-        layout.addWidget(container)
-        self.setLayout(layout)
-        
-    def get_url(self):
-        return self.url_input.text().strip()
+            self._entries.move_to_end(channel_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, channel_url):
+        """Server xác nhận không đổi (304): gia hạn ttl"""
+        with self._lock:
+            entry = self._entries.get(channel_url)
+            if entry is not None:
+                entry['checked_at'] = time.monotonic()
+
+    def invalidate_video(self, video_id):
+        """Bỏ các kênh đang trỏ tới video_id (livestream đã kết thúc / không có chat)"""
+        with self._lock:
+            for channel_url in [url for url, entry in self._entries.items() if entry['video_id'] == video_id]:
+                del self._entries[channel_url]
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
 
 class YouTubeChatOverlay(QMainWindow):
     """Main window cho YouTube Chat Overlay"""
     """Main window cho YouTube Chat Overlay"""
     new_message_signal = pyqtSignal(str, str, bool, bool, str) # author, message, is_member, is_sc, sc_amount
+    new_messages_signal = pyqtSignal(list) # batch [(author, message, is_member, is_sc, sc_amount), ...]
     connect_request_signal = pyqtSignal(str) # Signal để yêu cầu kết nối từ thread khác
+    detect_progress_signal = pyqtSignal(str) # Tiến trình tìm livestream (từ network loop)
+    RENDER_MAX_PER_FRAME = 10 # Số tin tối đa đưa vào danh sách mỗi frame
+    RENDER_ANIMATION_BACKLOG = 20 # Hàng chờ dài hơn mức này thì bỏ slide-in
 
     
     def __init__(self):
         super().__init__()
-        self.messages = []
-        self.youtube_chat = None
-        self.chat_thread = None
-        self.is_connected = False
+        self.chat_manager = None # ChatConnectionManager của các livestream đang kết nối
+        self.detect_task = None # Job tìm livestream đang chạy (huỷ được)
+        self.chat_latency = LatencyStats()
+        self.message_filter = MessageFilter()
+        # Render theo frame: tin đến được gom lại, mỗi frame vẽ tối đa RENDER_MAX_PER_FRAME tin
+        self.render_backlog = deque()
+        self.render_timer = QTimer(self)
+        self.render_timer.setInterval(1000 // 30)
+        self.render_timer.timeout.connect(self.render_frame)
+        # ms đưa tin vào model mỗi frame (không gồm layout/vẽ - Qt làm sau khi render_frame trả về)
+        self.insert_times = LatencyStats(maxlen=300)
+        self.render_stats = {'dropped_animations': 0, 'dropped_rows': 0}
         self.config = {
             'font_size': 14,
             'show_author': True,
@@ -849,21 +3293,48 @@ class YouTubeChatOverlay(QMainWindow):
             'msg_bg_color': 'rgba(255, 255, 255, 10)',
             'border_radius': 6,
             'animation_speed': 300,
+            'render_fps': 30,
+            'history_size': 2000,
             'message_timeout': 0,
             'message_timeout': 0,
             'autohide_header': False,
             'tts_enabled': False,
             'tts_translate': False,
             'translate_to_vi': True,
-            'tts_volume': 1.0
+            'translate_batch': True,
+            'tts_volume': 1.0,
+            'tts_keep_pcm': False,
+            'tts_engine': 'gtts',
+            'tts_fallback': True,
+            'tts_disk_cache': False,
+            'tts_queue_policy': 'drop_oldest',
+            'tts_queue_size': 50,
+            'tts_max_age': 60,
+            'tts_sample_every': 3,
+            'blacklist_fold_diacritics': False,
+            'coalesce_spam': True,
+            'archive_enabled': True
         }
         
         self.blacklist = []
+        self.blacklist_matcher = None
+        self._blacklist_key = None
         self.load_blacklist()
 
         
+        # Network loop dùng chung cho mọi network I/O (chat, tìm live, dịch, TTS)
+        self.network = NetworkLoop(parent=self)
+        self.network.start()
+        # HTTP session dùng chung + cache kênh -> livestream
+        self.http = create_http_session(self.network.max_concurrency) if REQUESTS_AVAILABLE else None
+        self.live_cache = ChannelLiveCache()
+        # Lưu trữ chat ra đĩa (thread ghi riêng)
+        self.chat_archive = ChatArchive()
+        self.chat_archive.start()
+        self.archive_dialog = None
+        
         # Init TTS
-        self.tts_thread = TTSThread()
+        self.tts_thread = TTSThread(self.network)
         self.tts_thread.start()
         
         # Init Audio Mixer ở Main Thread để OBS nhận diện ngay
@@ -882,7 +3353,9 @@ class YouTubeChatOverlay(QMainWindow):
         self.load_settings()
         self.load_settings()
         self.new_message_signal.connect(self.add_message)
+        self.new_messages_signal.connect(self.add_messages)
         self.connect_request_signal.connect(self.connect_to_youtube)
+        self.detect_progress_signal.connect(self.on_detect_progress)
         
         # Tự động kết nối sau khi khởi động
         # Dùng QTimer singleShot để đảm bảo UI đã load xong mới hiện Popup
@@ -945,8 +3418,15 @@ class YouTubeChatOverlay(QMainWindow):
         self.settings_panel.apply_btn.clicked.connect(self.apply_settings)
         self.settings_panel.detect_live_btn.clicked.connect(self.on_detect_live_clicked)
         self.settings_panel.test_voice_btn.clicked.connect(self.test_voice)
+        self.settings_panel.archive_search_btn.clicked.connect(self.open_archive_search)
         self.settings_panel.hide()
 
+        # Cập nhật thống kê khi settings panel đang mở
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(lambda: self.settings_panel.isVisible() and self.update_tts_stats())
+        self.stats_timer.start()
+
         
         # For dragging
         self.drag_position = QPoint()
@@ -995,6 +3475,19 @@ class YouTubeChatOverlay(QMainWindow):
         header_layout.addStretch()
         
         # Control buttons
+        self.skip_tts_btn = QPushButton("⏭")
+        self.skip_tts_btn.setFixedSize(28, 28)
+        self.skip_tts_btn.setToolTip("Bỏ qua câu đang đọc")
+        self.skip_tts_btn.clicked.connect(self.tts_thread.skip_current)
+        header_layout.addWidget(self.skip_tts_btn)
+        
+        self.history_btn = QPushButton("📜")
+        self.history_btn.setFixedSize(28, 28)
+        self.history_btn.setCheckable(True)
+        self.history_btn.setToolTip("Xem lại tin nhắn đã ẩn")
+        self.history_btn.clicked.connect(self.toggle_history)
+        header_layout.addWidget(self.history_btn)
+        
         self.settings_btn = QPushButton("⚙️")
         self.settings_btn.setFixedSize(28, 28)
         self.settings_btn.clicked.connect(self.toggle_settings)
@@ -1020,11 +3513,14 @@ class YouTubeChatOverlay(QMainWindow):
         self.header = header
     
     def create_chat_area(self, parent_layout):
-        """Tạo khu vực chat"""
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setStyleSheet("""
-            QScrollArea {
+        """Tạo khu vực chat (model/view - chỉ vẽ các dòng đang hiển thị)"""
+        # Overlay chỉ chứa tin chưa hết hạn; lịch sử là model riêng, chỉ gắn vào view khi bật 📜
+        self.chat_model = ChatListModel(self.config, parent=self)
+        self.history_model = ChatHistoryModel(capacity=self.config['history_size'], parent=self)
+
+        view = QListView()
+        view.setStyleSheet("""
+            QListView {
                 border: none;
                 background-color: transparent;
             }
@@ -1041,19 +3537,36 @@ class YouTubeChatOverlay(QMainWindow):
                 background: rgba(99, 102, 241, 150);
             }
         """)
-        
-        self.chat_widget = QWidget()
-        self.chat_widget.setStyleSheet("background-color: transparent;")
-        self.chat_layout = QVBoxLayout()
-        self.chat_layout.setContentsMargins(8, 8, 8, 8)
-        self.chat_layout.setSpacing(4)
-        self.chat_layout.addStretch()
-        
-        self.chat_widget.setLayout(self.chat_layout)
-        scroll.setWidget(self.chat_widget)
-        
-        parent_layout.addWidget(scroll)
-        self.scroll_area = scroll
+        view.viewport().setAutoFillBackground(False)
+        view.setViewportMargins(0, 4, 0, 4)
+        view.setFrameShape(QFrame.NoFrame)
+        view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        view.setSelectionMode(QAbstractItemView.NoSelection)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setFocusPolicy(Qt.NoFocus)
+        view.setResizeMode(QListView.Adjust)
+        view.setMouseTracking(True)
+
+        self.chat_delegate = ChatMessageDelegate(self.config, view)
+        view.setItemDelegate(self.chat_delegate)
+        view.setModel(self.chat_model)
+        self.chat_model.rows_repaint.connect(self.repaint_chat_rows)
+
+        # Hover để tạm dừng timeout (giống enterEvent/leaveEvent của widget cũ)
+        self.hovered_message = None
+        view.entered.connect(self.on_message_hovered)
+        view.viewport().installEventFilter(self)
+
+        # Tự cuộn theo tin mới khi đang ở cuối; cuộn lên xem lịch sử thì giữ nguyên vị trí.
+        # Cuộn theo rangeChanged (sau khi Qt layout xong), không ngay sau khi insert
+        self.follow_bottom = True
+        scrollbar = view.verticalScrollBar()
+        scrollbar.valueChanged.connect(self.on_chat_scrolled)
+        scrollbar.rangeChanged.connect(self.on_chat_range_changed)
+
+        parent_layout.addWidget(view)
+        self.chat_view = view
     
     def load_blacklist(self):
         """Load blacklist từ file"""
@@ -1064,6 +3577,7 @@ class YouTubeChatOverlay(QMainWindow):
                     self.blacklist = [line.strip().lower() for line in f if line.strip()]
         except Exception as e:
             print(f"Error loading blacklist: {e}")
+        self.compile_blacklist()
 
     def save_blacklist(self):
         """Save blacklist to file"""
@@ -1074,43 +3588,160 @@ class YouTubeChatOverlay(QMainWindow):
                 f.write(content)
         except Exception as e:
             print(f"Error saving blacklist: {e}")
+        self.compile_blacklist()
+
+    def compile_blacklist(self):
+        """Biên dịch blacklist thành matcher - chỉ build lại khi danh sách/tuỳ chọn thay đổi"""
+        fold = self.config.get('blacklist_fold_diacritics', False)
+        key = (tuple(self.blacklist), fold)
+        if self.blacklist_matcher is not None and key == self._blacklist_key:
+            return
+        self.blacklist_matcher = BlacklistMatcher(self.blacklist, fold_diacritics=fold)
+        self._blacklist_key = key
 
     def add_message(self, author, message, is_member=False, is_superchat=False, sc_amount=""):
         """Thêm tin nhắn mới với animation"""
-        
-        # CHECK BLACKLIST
-        msg_lower = message.lower()
-        if any(bad_word in msg_lower for bad_word in self.blacklist):
-            print(f"Blocked message containing bad word: {message}")
-            return # Skip bad messages
-            
+        self.add_messages([(author, message, is_member, is_superchat, sc_amount)])
+
+    def add_messages(self, batch):
+        """Lọc một batch tin nhắn (author, message, is_member, is_sc, sc_amount[, sent_at, source, id]) rồi đưa vào hàng chờ vẽ"""
         timestamp = datetime.now().strftime("%H:%M")
-        
-        msg_widget = ChatMessage(author, message, timestamp, self.config, is_member, is_superchat, sc_amount)
-        
-        # Insert before stretch
-        self.chat_layout.insertWidget(self.chat_layout.count() - 1, msg_widget)
-        self.messages.append(msg_widget)
-        
-        # Animate
-        msg_widget.show_animated()
-        
-        # Limit messages
-        if len(self.messages) > 50:
-            old_msg = self.messages.pop(0)
-            old_msg.deleteLater()
-        
-        # Auto scroll
-        QTimer.singleShot(50, lambda: self.scroll_area.verticalScrollBar().setValue(
-            self.scroll_area.verticalScrollBar().maximum()
-        ))
-        
+        now = time.monotonic()
+        records = []
+        for author, message, is_member, is_superchat, sc_amount, *extra in batch:
+            # Tin trùng ID (cùng tin nhận lại từ nguồn)
+            if self.message_filter.is_duplicate(extra[2] if len(extra) > 2 else None):
+                continue
+            # CHECK BLACKLIST
+            if self.blacklist_matcher.search(message):
+                print(f"Blocked message containing bad word: {message}")
+                continue # Skip bad messages
+            # Spam giống hệt trong cửa sổ thời gian: cộng ×N vào dòng cũ, không đọc TTS lại
+            coalesce = not is_superchat and author != "System"
+            if coalesce:
+                existing = self.message_filter.match(message, now)
+                if existing is not None:
+                    # seq được gán khi vào ChatHistory: < 0 là tin còn chờ vẽ (batch này hoặc render_backlog)
+                    pending = existing.seq < 0
+                    index = None if pending else self.chat_model.touch(existing)
+                    if pending or index is not None:
+                        self.message_filter.coalesce(message, existing, now)
+                        if index is not None and self.chat_view.model() is self.history_model:
+                            index = self.history_model.index_of(existing)
+                        if index is not None:
+                            # "×N" có thể làm dòng xuống hàng
+                            self.chat_delegate.update_row(index)
+                        continue
+            source = extra[1] if len(extra) > 1 else ""
+            sent_at = extra[0] if extra else None
+            record = ChatMessage(author, message, timestamp, is_member, is_superchat, sc_amount, source, sent_at)
+            if coalesce:
+                self.message_filter.remember(message, record, now)
+            records.append(record)
+
+        if not records:
+            return
+        # Vẽ ở frame kế tiếp (gộp mọi tin đến trong cùng một frame)
+        self.render_backlog.extend(records)
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
         # TTS - Chỉ đọc tin nhắn không phải System
-        if author != "System":
-            # Chỉ đọc nội dung tin nhắn
-            text_to_read = message
-            self.tts_thread.add_text(text_to_read)
+        for record in records:
+            if record.author != "System":
+                # Chỉ đọc nội dung tin nhắn
+                self.tts_thread.add_text(record.message, record.is_member, record.is_superchat)
+
+    def render_frame(self):
+        """Một frame: đưa tối đa RENDER_MAX_PER_FRAME tin từ hàng chờ vào model, một lần scroll"""
+        backlog = self.render_backlog
+        # Tin vượt dung lượng lịch sử sẽ bị đẩy ra ngay nên không cần vẽ
+        while len(backlog) > self.history_model.capacity:
+            backlog.popleft()
+            self.render_stats['dropped_rows'] += 1
+
+        # Dồn nhiều: bỏ slide-in để kịp hiện hết
+        animate = len(backlog) <= self.RENDER_ANIMATION_BACKLOG
+        records = [backlog.popleft() for _ in range(min(len(backlog), self.RENDER_MAX_PER_FRAME))]
+        if records:
+            started = time.perf_counter()
+            self.history_model.append_many(records) # Gán seq trước khi vào overlay
+            self.chat_model.append_many(records, animate=animate)
+            self.insert_times.add((time.perf_counter() - started) * 1000)
+            if not animate:
+                self.render_stats['dropped_animations'] += len(records)
+
+            now = time.time()
+            for record in records:
+                if record.sent_at:
+                    self.chat_latency.add(now - record.sent_at)
+        if not backlog:
+            self.render_timer.stop()
+
+    def toggle_history(self):
+        """Đổi view giữa overlay (tin đang hiện) và toàn bộ lịch sử để cuộn xem lại"""
+        show = self.history_btn.isChecked()
+        self.release_hovered_message()
+        if show:
+            self.history_model.flush()
+        old_selection = self.chat_view.selectionModel()
+        self.chat_view.setModel(self.history_model if show else self.chat_model)
+        old_selection.deleteLater()
+        self.follow_bottom = True
+        self.chat_view.scrollToBottom()
+
+    def repaint_chat_rows(self, first, last):
+        """Vẽ lại vùng chứa các dòng đang animation (không layout lại)"""
+        if self.chat_view.model() is not self.chat_model:
+            return # Đang xem lịch sử
+        rect = self.chat_view.visualRect(self.chat_model.index(first))
+        if last != first:
+            rect = rect.united(self.chat_view.visualRect(self.chat_model.index(last)))
+        self.chat_view.viewport().update(rect)
+
+    def on_chat_scrolled(self, value):
+        self.follow_bottom = value >= self.chat_view.verticalScrollBar().maximum()
+
+    def on_chat_range_changed(self, minimum, maximum):
+        if self.follow_bottom:
+            self.chat_view.verticalScrollBar().setValue(maximum)
+
+    def set_render_fps(self, fps):
+        interval = max(1, 1000 // fps)
+        self.render_timer.setInterval(interval)
+        self.chat_model.tick_timer.setInterval(interval)
+
+    def on_message_hovered(self, index):
+        """Pause timeout on hover"""
+        record = index.data(ChatListModel.MessageRole)
+        if record is self.hovered_message:
+            return
+        self.release_hovered_message()
+        if record is not None:
+            self.chat_model.pause_expiry(record)
+        self.hovered_message = record
+
+    def release_hovered_message(self):
+        """Resume timeout on leave"""
+        if self.hovered_message is not None:
+            self.chat_model.resume_expiry(self.hovered_message)
+            self.hovered_message = None
 
+    def eventFilter(self, obj, event):
+        if obj is self.chat_view.viewport() and event.type() == QEvent.Leave:
+            self.release_hovered_message()
+        return super().eventFilter(obj, event)
+
+    def refresh_chat_style(self):
+        """Vẽ lại toàn bộ tin nhắn theo config mới - chỉ layout lại khi style/font đổi"""
+        if self.chat_delegate.invalidate():
+            # Model còn lại đo lại chiều cao khi được gắn vào view (size_key theo style.version)
+            model = self.chat_view.model()
+            model.layoutAboutToBeChanged.emit()
+            model.layoutChanged.emit()
+        else:
+            # Bo góc/độ mờ... chỉ cần vẽ lại
+            self.chat_view.viewport().update()
     
     def startup_auto_connect(self):
         """Hiển thị popup custom nhập URL khi khởi động"""
@@ -1125,13 +3756,13 @@ class YouTubeChatOverlay(QMainWindow):
                 # Update lại vào settings panel (nhưng không save ngay để tránh ghi đè rác)
                 self.settings_panel.url_input.setText(url)
                 
-                # Start connection thread
-                threading.Thread(target=self._startup_connect_thread, args=(url,), daemon=True).start()
+                # Tìm kiếm và kết nối trên network loop
+                self.network.submit(self._startup_connect(url))
         else:
             pass
 
-    def _startup_connect_thread(self, url):
-        """Thread thực hiện tìm kiếm và kết nối"""
+    async def _startup_connect(self, url):
+        """Tìm kiếm livestream (nếu là link kênh) rồi yêu cầu kết nối - chạy trên network loop"""
         # Kiểm tra xem có phải channel không
         is_channel = any(x in url for x in ['/@', '/channel/', '/c/', '/user/'])
         
@@ -1142,7 +3773,7 @@ class YouTubeChatOverlay(QMainWindow):
             self.new_message_signal.emit("System", "Đang tìm livestream trên kênh...", False, False, "")
             
             # Tìm live stream
-            live_url = self.find_live_stream_from_channel(url, silent=True)
+            live_url = await self.resolve_live_urls(url, self.report_system)
             if live_url:
                 target_url = live_url
                 self.new_message_signal.emit("System", "Đã tìm thấy livestream! Đang kết nối...", False, False, "")
@@ -1166,7 +3797,50 @@ class YouTubeChatOverlay(QMainWindow):
                 btn_pos.x() - self.settings_panel.width() + self.settings_btn.width(),
                 btn_pos.y() + self.settings_btn.height() + 8
             )
+            self.update_tts_stats()
             self.settings_panel.show()
+
+    def update_tts_stats(self):
+        """Hiển thị thống kê chat (poll, độ trễ) và TTS (cache giọng đọc, cache dịch, hàng đợi) trong settings panel"""
+        audio = self.tts_thread.audio_cache.stats()
+        trans = self.tts_thread.translator.stats()
+        lines = [
+            f"Cache giọng đọc: {audio['hit_rate']:.0%} trúng "
+            f"({audio['hits'] + audio['disk_hits']}/{audio['hits'] + audio['disk_hits'] + audio['misses']}), "
+            f"{audio['entries']} câu, {audio['bytes'] / 1024 / 1024:.1f} MB",
+            f"Cache dịch: {trans['hit_rate']:.0%} trúng, {trans['requests']} request",
+        ]
+        queue = self.tts_thread.queue
+        dropped = queue.dropped
+        lines.append(
+            f"Hàng đợi: {len(queue)}/{queue.maxlen}, đã bỏ {queue.dropped_total()} "
+            f"(đầy {dropped['overflow']}, lọc {dropped['policy']}, quá hạn {dropped['expired']}, "
+            f"trùng {dropped['coalesced']})"
+        )
+        lines.append(f"Lọc chat: bỏ {self.message_filter.duplicates} tin trùng, gộp {self.message_filter.coalesced} tin spam")
+        inserts = self.insert_times.stats()
+        lines.append(
+            f"Render: {self.config['render_fps']} FPS, chèn vào model TB {inserts['avg']:.1f}ms "
+            f"(p95 {inserts['p95']:.1f}ms), "
+            f"bỏ animation {self.render_stats['dropped_animations']}, bỏ qua {self.render_stats['dropped_rows']} tin, "
+            f"chờ {len(self.render_backlog)}"
+        )
+        archive = self.chat_archive
+        if archive.error is not None:
+            lines.append(f"Lưu trữ: lỗi ({archive.error})")
+        else:
+            lines.append(
+                f"Lưu trữ: đã ghi {archive.written} tin, chờ {archive.pending()} batch, bỏ {archive.dropped}"
+                f"{'' if archive.fts else ' (không có FTS5, tìm bằng LIKE)'}"
+            )
+        if self.chat_manager is not None and self.chat_manager.is_connected:
+            latency = self.chat_latency.stats()
+            lines.insert(0,
+                f"Chat ({len(self.chat_manager.sources)} nguồn): {self.chat_manager.polls_per_minute():.0f} lần poll/phút "
+                f"(nghỉ {self.chat_manager.interval():.2f}s), độ trễ TB {latency['avg']:.1f}s, "
+                f"p95 {latency['p95']:.1f}s ({latency['count']} tin)"
+            )
+        self.settings_panel.tts_stats_label.setText("\n".join(lines))
     
     def toggle_opacity(self):
         """Toggle độ mờ nhanh"""
@@ -1190,18 +3864,42 @@ class YouTubeChatOverlay(QMainWindow):
             'accent_color': self.settings_panel.colors.get('accent', '#6366f1'),
             'border_radius': self.settings_panel.radius_slider.value(),
             'animation_speed': self.settings_panel.anim_slider.value(),
+            'render_fps': self.settings_panel.fps_slider.value(),
+            'history_size': self.settings_panel.history_slider.value(),
             'message_timeout': self.settings_panel.timeout_slider.value(),
             'autohide_header': self.settings_panel.autohide_header_cb.isChecked(),
             'tts_enabled': self.settings_panel.tts_cb.isChecked(),
             'tts_translate': self.settings_panel.translate_cb.isChecked(),
-            'translate_to_vi': self.settings_panel.rb_en_vi.isChecked()
+            'translate_to_vi': self.settings_panel.rb_en_vi.isChecked(),
+            'translate_batch': self.settings_panel.translate_batch_cb.isChecked(),
+            'tts_keep_pcm': self.settings_panel.tts_keep_pcm_cb.isChecked(),
+            'tts_engine': self.settings_panel.tts_engine_combo.currentData(),
+            'tts_fallback': self.settings_panel.tts_fallback_cb.isChecked(),
+            'tts_disk_cache': self.settings_panel.tts_disk_cache_cb.isChecked(),
+            'tts_queue_policy': self.settings_panel.tts_policy_combo.currentData(),
+            'tts_queue_size': self.settings_panel.tts_queue_slider.value(),
+            'tts_max_age': self.settings_panel.tts_age_slider.value(),
+            'blacklist_fold_diacritics': self.settings_panel.blacklist_fold_cb.isChecked(),
+            'coalesce_spam': self.settings_panel.coalesce_cb.isChecked(),
+            'archive_enabled': self.settings_panel.archive_cb.isChecked()
         })
+        self.message_filter.enabled = self.config['coalesce_spam']
+        self.chat_archive.enabled = self.config['archive_enabled']
         
         # Update TTS settings
         self.tts_thread.enabled = self.config['tts_enabled']
+        if not self.tts_thread.enabled:
+            self.tts_thread.flush()
         self.tts_thread.translate_enabled = self.config['tts_translate']
         self.tts_thread.translate_to_vi = self.config['translate_to_vi']
+        self.tts_thread.translate_batch_size = 8 if self.config['translate_batch'] else 1
         self.tts_thread.volume = self.settings_panel.tts_vol_slider.value() / 100.0
+        self.tts_thread.keep_pcm = self.config['tts_keep_pcm']
+        self.tts_thread.engine = self.config['tts_engine']
+        self.tts_thread.fallback_enabled = self.config['tts_fallback']
+        self.tts_thread.audio_cache.disk_dir = TTS_CACHE_DIR if self.config['tts_disk_cache'] else None
+        self.tts_thread.configure_queue(self.config['tts_queue_policy'], self.config['tts_queue_size'],
+                                        self.config['tts_max_age'], self.config['tts_sample_every'])
         
         # Save Blacklist
         self.save_blacklist()
@@ -1216,6 +3914,9 @@ class YouTubeChatOverlay(QMainWindow):
         """)
         
         self.update_header_visibility()
+        self.refresh_chat_style()
+        self.set_render_fps(self.config['render_fps'])
+        self.history_model.set_capacity(self.config['history_size'])
         
         # Check if URL changed
         url = self.settings_panel.url_input.text().strip()
@@ -1226,7 +3927,11 @@ class YouTubeChatOverlay(QMainWindow):
         self.settings_panel.hide()
     
     def on_detect_live_clicked(self):
-        """Xử lý khi nhấn nút tự động tìm live stream"""
+        """Xử lý khi nhấn nút tự động tìm live stream (nhấn lần nữa để huỷ)"""
+        if self.detect_task is not None:
+            self.cancel_live_detection()
+            return
+
         url = self.settings_panel.url_input.text().strip()
         
         if not url:
@@ -1237,21 +3942,85 @@ class YouTubeChatOverlay(QMainWindow):
         is_channel = any(x in url for x in ['/@', '/channel/', '/c/', '/user/'])
         
         if is_channel:
-            # Tìm live stream từ channel
-            QMessageBox.information(self, "Đang tìm kiếm", 
-                "Đang tìm live stream trên channel...\nVui lòng đợi.")
-            
-            live_url = self.find_live_stream_from_channel(url)
-            
-            if live_url:
-                self.settings_panel.url_input.setText(live_url)
-                QMessageBox.information(self, "Thành công", 
-                    f"Đã tìm thấy live stream!\n\nNhấn 'Áp dụng' để kết nối.")
+            # Tìm live stream từ channel (chạy nền, không chặn UI)
+            self.start_live_detection(url, self.on_live_detected)
         else:
             # Đã là video URL, chỉ cần kết nối
             QMessageBox.information(self, "Thông báo", 
                 "Đây là URL video. Nhấn 'Áp dụng' để kết nối.")
-        
+
+    def on_live_detected(self, live_url, error):
+        if live_url:
+            self.settings_panel.url_input.setText(live_url)
+            QMessageBox.information(self, "Thành công", 
+                f"Đã tìm thấy live stream!\n\nNhấn 'Áp dụng' để kết nối.")
+        else:
+            QMessageBox.information(self, "Thông báo", error)
+
+    def start_live_detection(self, url, on_done):
+        """Tìm livestream trên network loop; on_done(live_url, error) được gọi ở UI thread"""
+        self.cancel_live_detection()
+        self.settings_panel.detect_live_btn.setText("⏹ Huỷ tìm kiếm")
+        self.settings_panel.detect_status_label.setText("Đang tìm live stream trên channel...")
+        self.settings_panel.detect_status_label.show()
+
+        def finished(future):
+            if future is not self.detect_task:
+                return # Đã bị thay bởi job mới
+            self.detect_task = None
+            self.reset_detect_ui()
+            try:
+                live_url, error = future.result()
+            except Exception as e:
+                live_url, error = None, f"Lỗi khi tìm live stream: {str(e)}"
+            on_done(live_url, error)
+
+        self.detect_task = self.network.submit(self._detect_live(url), finished)
+
+    async def _detect_live(self, url):
+        errors = []
+        def report(msg, is_error=False):
+            self.detect_progress_signal.emit(msg)
+            if is_error:
+                errors.append(msg)
+        live_url = await self.resolve_live_urls(url, report)
+        return live_url, (errors[-1] if errors else "Không tìm thấy live stream đang diễn ra trên channel này.")
+
+    async def resolve_live_urls(self, url, report):
+        """Đổi các link kênh trong danh sách URL (cách nhau bởi dấu phẩy) thành link livestream
+
+        Các kênh được tìm song song; kênh không có livestream bị bỏ qua. Trả về None nếu không còn URL nào.
+        """
+        urls = [part.strip() for part in url.split(',') if part.strip()]
+
+        async def resolve(part):
+            if self.extract_video_id(part):
+                return part
+            return await self.network.run_blocking(self.find_live_stream_from_channel, part, report)
+
+        resolved = [part for part in await asyncio.gather(*(resolve(part) for part in urls)) if part]
+        return ', '.join(resolved) if resolved else None
+
+    def cancel_live_detection(self):
+        if self.detect_task is not None:
+            # Request HTTP đang chạy sẽ tự kết thúc (timeout), kết quả bị bỏ qua
+            self.detect_task.cancel()
+            self.detect_task = None
+            self.reset_detect_ui()
+
+    def reset_detect_ui(self):
+        self.settings_panel.detect_live_btn.setText("🔍 Tự động tìm Live Stream")
+        self.settings_panel.detect_status_label.hide()
+
+    def on_detect_progress(self, text):
+        if self.detect_task is None:
+            return # Job đã bị huỷ
+        self.settings_panel.detect_status_label.setText(text)
+        self.settings_panel.detect_status_label.show()
+
+    def report_system(self, msg, is_error=False):
+        """Báo tiến trình tìm livestream lên khung chat (gọi được từ thread bất kỳ)"""
+        self.new_message_signal.emit("System", msg, False, False, "")
 
     def update_header_visibility(self):
         """Update header visibility based on settings"""
@@ -1287,11 +4056,26 @@ class YouTubeChatOverlay(QMainWindow):
         toggle_header_action = menu.addAction("👁️ Ẩn/Hiện Header")
         toggle_header_action.triggered.connect(self.toggle_header_manual)
         
+        skip_tts_action = menu.addAction("⏭ Bỏ qua câu đang đọc")
+        skip_tts_action.triggered.connect(self.tts_thread.skip_current)
+        
+        search_action = menu.addAction("🔎 Tìm trong lưu trữ chat")
+        search_action.triggered.connect(self.open_archive_search)
+        
         close_action = menu.addAction("✕ Thoát")
         close_action.triggered.connect(self.close)
         
         menu.exec_(event.globalPos())
         
+    def open_archive_search(self):
+        """Mở cửa sổ tìm trong lưu trữ chat (giữ một cửa sổ, không modal)"""
+        self.settings_panel.hide()
+        if self.archive_dialog is None:
+            self.archive_dialog = ArchiveSearchDialog(self.chat_archive, self.network, self)
+        self.archive_dialog.show()
+        self.archive_dialog.raise_()
+        self.archive_dialog.activateWindow()
+
     def toggle_header_manual(self):
         if self.header.isVisible():
             self.header.hide()
@@ -1318,34 +4102,23 @@ class YouTubeChatOverlay(QMainWindow):
                 "pytchat chưa được cài đặt!\n\nCài đặt bằng lệnh:\npip install pytchat")
             return
         
-        # Clean URL
-        url = url.strip()
-        if '?' in url and 'watch?v=' not in url:
-             url = url.split('?')[0]
-
-        video_id = self.extract_video_id(url)
-        
-        # Nếu không phải link video trực tiếp, kiểm tra xem có phải link kênh không
-        if not video_id:
-            is_channel = any(x in url for x in ['/@', '/channel/', '/c/', '/user/'])
-            if is_channel:
-                self.new_message_signal.emit("System", "Đang tìm livestream từ link kênh...", False, False, "")
-                # Tìm kiếm (chạy đồng bộ ở đây vì đang trong event click nút Apply)
-                # Tuy nhiên find_live_stream_from_channel có thể hơi lâu, 
-                # nhưng chấp nhận được trong trường hợp bấm nút.
-                found_url = self.find_live_stream_from_channel(url, silent=True)
-                
-                if found_url:
-                    video_id = self.extract_video_id(found_url)
-                    # Cập nhật lại UI để người dùng thấy link thật (tùy chọn)
-                    # self.settings_panel.url_input.setText(found_url) 
-                else:
-                    QMessageBox.warning(self, "Lỗi", "Kênh này hiện không có livestream để kết nối!")
-                    return
+        # Nhiều livestream: các URL cách nhau bởi dấu phẩy
+        urls = [self.clean_url(part) for part in url.split(',') if part.strip()]
+        video_ids = [self.extract_video_id(part) for part in urls]
+        
+        # Link kênh (không phải link video trực tiếp): tìm livestream trước
+        channels = [part for part, video_id in zip(urls, video_ids)
+                    if not video_id and any(x in part for x in ['/@', '/channel/', '/c/', '/user/'])]
+        if channels:
+            self.new_message_signal.emit("System", "Đang tìm livestream từ link kênh...", False, False, "")
+            # Tìm kiếm chạy nền trên network loop, tìm thấy thì gọi lại connect_to_youtube với link video
+            self.start_live_detection(', '.join(urls), self.on_channel_live_found)
+            return
         
-        if not video_id:
+        if not video_ids or not all(video_ids):
             QMessageBox.warning(self, "Lỗi", "URL YouTube không hợp lệ!\nVui lòng nhập Link Video hoặc Link Channel.")
             return
+        video_ids = list(dict.fromkeys(video_ids))
         
         # Stop demo mode & cleanup
         if hasattr(self, 'chat_timer'):
@@ -1355,96 +4128,49 @@ class YouTubeChatOverlay(QMainWindow):
         self.disconnect_youtube()
         
         # Clear messages
-        for msg in self.messages:
-            msg.deleteLater()
-        self.messages.clear()
+        self.hovered_message = None
+        self.render_backlog.clear()
+        self.chat_model.clear()
+        self.history_model.clear()
+        self.tts_thread.flush()
+        self.chat_latency.clear()
+        self.message_filter.clear()
         
         # Start connection in background thread
-        self.new_message_signal.emit("System", f"Video ID: {video_id}", False, False, "")
+        self.new_message_signal.emit("System", f"Video ID: {', '.join(video_ids)}", False, False, "")
         self.new_message_signal.emit("System", "Đang khởi tạo kết nối (Background)...", False, False, "")
         
-        threading.Thread(target=self._connect_thread_worker, args=(video_id,), daemon=True).start()
-            
-    def _connect_thread_worker(self, video_id):
-        """Worker thread để khởi tạo pytchat mà không block UI"""
-        try:
-            self.new_message_signal.emit("System", f"Đang kết nối tới ID: {video_id}...", False, False, "")
-            print(f"DEBUG: Calling pytchat.create for {video_id}")
-            
-            # Thêm tham số logger để debug nếu cần, và thử tắt topchat_only
-            # seek_time=0 để đảm bảo bắt đầu từ hiện tại
-            chat = pytchat.create(
-                video_id=video_id,
-                topchat_only=False, # Lấy tất cả tin nhắn
-                interruptable=False
-            )
-            
-            print("DEBUG: pytchat.create returned")
-            
-            if not chat.is_alive():
-                 print("DEBUG: chat.is_alive() is False immediately")
-                 self.new_message_signal.emit("System", "⚠️ Lỗi: Chat stream chưa sẵn sàng hoặc Video ID không hỗ trợ chat.", False, False, "")
-                 # Vẫn thử return object để xem có may mắn không
-                 # return
-
-            # Gán vào biến member sau khi khởi tạo thành công
-            self.youtube_chat = chat
-            self.is_connected = True
-            
-            # Start fetch thread
-            self.chat_thread = threading.Thread(target=self.fetch_youtube_chat, daemon=True)
-            self.chat_thread.start()
-            
-            print(f"Connected to YouTube chat: {video_id}")
-            self.new_message_signal.emit("System", "✅ Đã kết nối! Đang lấy tin nhắn...", False, False, "")
-            
-        except Exception as e:
-            self.new_message_signal.emit("System", f"❌ Lỗi Pytchat: {str(e)}", False, False, "")
-            print(f"Error connecting: {e}")
-            import traceback
-            traceback.print_exc()
+        self.chat_manager = ChatConnectionManager(
+            self.network,
+            self.new_messages_signal.emit,
+            self.report_system,
+            self.live_cache.invalidate_video,
+            self.chat_archive,
+        )
+        self.chat_manager.start(video_ids)
 
-    
-    def fetch_youtube_chat(self):
-        """Fetch messages from YouTube chat (runs in thread)"""
-        try:
-            # Chờ một chút trước khi loop
-            import time
-            time.sleep(1)
+    def clean_url(self, url):
+        """Bỏ khoảng trắng và query params (?si=...) của link kênh"""
+        url = url.strip()
+        if '?' in url and 'watch?v=' not in url:
+             url = url.split('?')[0]
+        return url
             
-            self.new_message_signal.emit("System", "🔄 Bắt đầu lấy tin nhắn...", False, False, "")
+    def on_channel_live_found(self, live_url, error):
+        """Kết quả tìm livestream khi Apply bằng link kênh"""
+        if live_url and all(self.extract_video_id(part) for part in live_url.split(',')):
+            # Cập nhật lại UI để người dùng thấy link thật (tùy chọn)
+            # self.settings_panel.url_input.setText(live_url) 
+            self.connect_to_youtube(live_url)
+        else:
+            self.new_message_signal.emit("System", error, False, False, "")
+            QMessageBox.warning(self, "Lỗi", "Kênh này hiện không có livestream để kết nối!")
             
-            while self.youtube_chat and self.youtube_chat.is_alive() and self.is_connected:
-                for chat in self.youtube_chat.get().sync_items():
-                    author = chat.author.name
-                    message = chat.message
-                    
-                    # Extract Metadata
-                    is_member = chat.author.isChatSponsor
-                    amount = chat.amountString # Not empty if superchat
-                    is_superchat = bool(amount)
-                    
-                    self.new_message_signal.emit(author, message, is_member, is_superchat, amount)
-                    
-                # Sleep một chút để giảm tải CPU
-                time.sleep(0.5)
-                
-        except Exception as e:
-            print(f"Error fetching chat: {e}")
-            self.new_message_signal.emit("System", f"⚠️ Mất kết nối chat: {str(e)}", False, False, "")
-            self.is_connected = False
-    
     def disconnect_youtube(self):
         """Disconnect from YouTube chat"""
-        self.is_connected = False
-        if self.youtube_chat:
-            try:
-                self.youtube_chat.terminate()
-            except:
-                pass
-            self.youtube_chat = None
-        if self.chat_thread:
-            self.chat_thread = None
+        if self.chat_manager is not None:
+            self.chat_manager.stop()
+            self.chat_manager = None
     
     def create_tray_icon(self):
         """Tạo system tray icon"""
@@ -1528,15 +4254,21 @@ class YouTubeChatOverlay(QMainWindow):
         """Thoát ứng dụng"""
         self.save_settings()
         self.disconnect_youtube()
+        self.tts_thread.stop()
+        self.network.stop()
+        if self.http is not None:
+            self.http.close()
+        self.chat_archive.close()
         self.tray_icon.hide()
         QApplication.quit()
     
-    def find_live_stream_from_channel(self, channel_url, silent=False):
-        """Tìm live stream từ channel URL"""
+    def find_live_stream_from_channel(self, channel_url, report):
+        """Tìm live stream từ channel URL (chạy ngoài UI thread)
+
+        report(msg, is_error=False): báo tiến trình/lỗi, phải thread-safe (emit signal).
+        """
         if not REQUESTS_AVAILABLE:
-            if not silent:
-                QMessageBox.warning(self, "Lỗi", 
-                    "Cần cài đặt requests và beautifulsoup4!\n\nCài đặt bằng lệnh:\npip install requests beautifulsoup4")
+            report("Cần cài đặt requests và beautifulsoup4!\n\nCài đặt bằng lệnh:\npip install requests beautifulsoup4", True)
             return None
         
         try:
@@ -1544,11 +4276,11 @@ class YouTubeChatOverlay(QMainWindow):
             if '?' in channel_url:
                 channel_url = channel_url.split('?')[0]
                 
-            # Lấy channel page
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept-Language': 'en-US,en;q=0.9',
-            }
+            # Kênh vừa được tìm thấy gần đây -> dùng lại, không tải lại trang /live
+            cached, fresh = self.live_cache.get(channel_url)
+            if fresh:
+                report(f"Đã tìm thấy Video ID (Cache): {cached['video_id']}")
+                return f"https://www.youtube.com/watch?v={cached['video_id']}"
             
             # Xử lý các dạng URL channel khác nhau
             if '@' in channel_url:
@@ -1563,59 +4295,36 @@ class YouTubeChatOverlay(QMainWindow):
             else:
                 live_url = channel_url.rstrip('/') + '/live'
             
-            # Log lên UI nếu đang chạy ngầm
-            if silent:
-                self.new_message_signal.emit("System", f"Đang truy cập: {live_url}", False, False, "")
+            report(f"Đang truy cập: {live_url}")
             
             print(f"Fetching: {live_url}")
-            response = requests.get(live_url, headers=headers, timeout=10)
+            # Cache hết hạn: hỏi lại server có điều kiện, 304 = trang không đổi
+            response = self.http.get(live_url, headers=self.live_cache.conditional_headers(cached), timeout=10, stream=True)
+            
+            if response.status_code == 304 and cached:
+                response.close()
+                self.live_cache.touch(channel_url)
+                report(f"Đã tìm thấy Video ID (Cache, 304): {cached['video_id']}")
+                return f"https://www.youtube.com/watch?v={cached['video_id']}"
             
             if response.status_code == 200:
-                content = response.text
-                
-                # Check link canonical trước (thường chính xác nhất)
-                # <link rel="canonical" href="https://www.youtube.com/watch?v=VIDEO_ID">
-                canonical_match = re.search(r'<link rel="canonical" href="https://www.youtube.com/watch\?v=([a-zA-Z0-9_-]{11})">', content)
-                if canonical_match:
-                    video_id = canonical_match.group(1)
-                    if silent:
-                        self.new_message_signal.emit("System", f"Đã tìm thấy Video ID (Canonical): {video_id}", False, False, "")
+                # Đọc theo chunk, dừng ngay khi tìm thấy (canonical thường nằm gần đầu trang)
+                with response:
+                    video_id, method = scan_live_page(response.iter_content(chunk_size=16 * 1024))
+                if video_id:
+                    self.live_cache.put(channel_url, video_id, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    report(f"Đã tìm thấy Video ID ({method}): {video_id}")
                     return f"https://www.youtube.com/watch?v={video_id}"
                 
-                # Pattern dự phòng để tìm video ID
-                patterns = [
-                    r'"videoId":"([a-zA-Z0-9_-]{11})"',
-                    r'watch\?v=([a-zA-Z0-9_-]{11})',
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        video_id = match.group(1)
-                        if silent:
-                            self.new_message_signal.emit("System", f"Đã tìm thấy Video ID (Regex): {video_id}", False, False, "")
-                        return f"https://www.youtube.com/watch?v={video_id}"
-                
-                if not silent:
-                    QMessageBox.information(self, "Thông báo", 
-                        "Không tìm thấy live stream đang diễn ra trên channel này.")
-                else:
-                    self.new_message_signal.emit("System", "Không tìm thấy Video ID trong trang /live", False, False, "")
+                report("Không tìm thấy Video ID trong trang /live")
                 return None
             else:
-                msg = f"Lỗi truy cập channel (Status: {response.status_code})"
-                if not silent:
-                    QMessageBox.warning(self, "Lỗi", msg)
-                else:
-                    self.new_message_signal.emit("System", msg, False, False, "")
+                response.close()
+                report(f"Lỗi truy cập channel (Status: {response.status_code})", True)
                 return None
                 
         except Exception as e:
-            msg = f"Lỗi khi tìm live stream: {str(e)}"
-            if not silent:
-                QMessageBox.critical(self, "Lỗi", msg)
-            else:
-                 self.new_message_signal.emit("System", msg, False, False, "")
+            report(f"Lỗi khi tìm live stream: {str(e)}", True)
             return None
     
     def closeEvent(self, event):
@@ -1633,6 +4342,11 @@ class YouTubeChatOverlay(QMainWindow):
         else:
             self.save_settings()
             self.disconnect_youtube()
+            self.tts_thread.stop()
+            self.network.stop()
+            if self.http is not None:
+                self.http.close()
+            self.chat_archive.close()
             event.accept()
 
     
@@ -1647,12 +4361,26 @@ class YouTubeChatOverlay(QMainWindow):
             'colors': self.settings_panel.colors,
             'border_radius': self.settings_panel.radius_slider.value(),
             'animation_speed': self.settings_panel.anim_slider.value(),
+            'render_fps': self.settings_panel.fps_slider.value(),
+            'history_size': self.settings_panel.history_slider.value(),
             'message_timeout': self.settings_panel.timeout_slider.value(),
             'autohide_header': self.settings_panel.autohide_header_cb.isChecked(),
             'tts_enabled': self.settings_panel.tts_cb.isChecked(),
             'tts_translate': self.settings_panel.translate_cb.isChecked(),
             'translate_to_vi': self.settings_panel.rb_en_vi.isChecked(),
+            'translate_batch': self.settings_panel.translate_batch_cb.isChecked(),
             'tts_volume': self.settings_panel.tts_vol_slider.value(),
+            'tts_keep_pcm': self.settings_panel.tts_keep_pcm_cb.isChecked(),
+            'tts_engine': self.settings_panel.tts_engine_combo.currentData(),
+            'tts_fallback': self.settings_panel.tts_fallback_cb.isChecked(),
+            'tts_disk_cache': self.settings_panel.tts_disk_cache_cb.isChecked(),
+            'tts_queue_policy': self.settings_panel.tts_policy_combo.currentData(),
+            'tts_queue_size': self.settings_panel.tts_queue_slider.value(),
+            'tts_max_age': self.settings_panel.tts_age_slider.value(),
+            'tts_sample_every': self.config['tts_sample_every'],
+            'blacklist_fold_diacritics': self.settings_panel.blacklist_fold_cb.isChecked(),
+            'coalesce_spam': self.settings_panel.coalesce_cb.isChecked(),
+            'archive_enabled': self.settings_panel.archive_cb.isChecked(),
             # Lưu vị trí và kích thước cửa sổ
 
             'window_x': self.x(),
@@ -1686,6 +4414,17 @@ class YouTubeChatOverlay(QMainWindow):
                 
                 if 'animation_speed' in settings:
                     self.settings_panel.anim_slider.setValue(settings['animation_speed'])
+
+                if 'render_fps' in settings:
+                    self.settings_panel.fps_slider.setValue(settings['render_fps'])
+                    self.config['render_fps'] = settings['render_fps']
+                    self.set_render_fps(settings['render_fps'])
+
+                if 'history_size' in settings:
+                    self.settings_panel.history_slider.setValue(settings['history_size'])
+                    # Slider giới hạn giá trị cũ vượt mức tối đa
+                    self.config['history_size'] = self.settings_panel.history_slider.value()
+                    self.history_model.set_capacity(self.config['history_size'])
                     
                 if 'message_timeout' in settings:
                     self.settings_panel.timeout_slider.setValue(settings['message_timeout'])
@@ -1711,6 +4450,70 @@ class YouTubeChatOverlay(QMainWindow):
                     # Update visible state
                     self.settings_panel.rb_en_vi.setVisible(settings['tts_translate'])
                     self.settings_panel.rb_vi_en.setVisible(settings['tts_translate'])
+                    self.settings_panel.translate_batch_cb.setVisible(settings['tts_translate'])
+
+                if 'translate_batch' in settings:
+                    self.settings_panel.translate_batch_cb.setChecked(settings['translate_batch'])
+                    self.config['translate_batch'] = settings['translate_batch']
+                    self.tts_thread.translate_batch_size = 8 if settings['translate_batch'] else 1
+                
+                if 'tts_keep_pcm' in settings:
+                    self.settings_panel.tts_keep_pcm_cb.setChecked(settings['tts_keep_pcm'])
+                    self.tts_thread.keep_pcm = settings['tts_keep_pcm']
+
+                if 'tts_engine' in settings:
+                    index = self.settings_panel.tts_engine_combo.findData(settings['tts_engine'])
+                    if index >= 0:
+                        self.settings_panel.tts_engine_combo.setCurrentIndex(index)
+                        self.config['tts_engine'] = settings['tts_engine']
+                        self.tts_thread.engine = settings['tts_engine']
+
+                if 'tts_fallback' in settings:
+                    self.settings_panel.tts_fallback_cb.setChecked(settings['tts_fallback'])
+                    self.config['tts_fallback'] = settings['tts_fallback']
+                    self.tts_thread.fallback_enabled = settings['tts_fallback']
+
+                if 'tts_disk_cache' in settings:
+                    self.settings_panel.tts_disk_cache_cb.setChecked(settings['tts_disk_cache'])
+                    self.config['tts_disk_cache'] = settings['tts_disk_cache']
+                    self.tts_thread.audio_cache.disk_dir = TTS_CACHE_DIR if settings['tts_disk_cache'] else None
+
+                if 'tts_queue_policy' in settings:
+                    index = self.settings_panel.tts_policy_combo.findData(settings['tts_queue_policy'])
+                    if index >= 0:
+                        self.settings_panel.tts_policy_combo.setCurrentIndex(index)
+                        self.config['tts_queue_policy'] = settings['tts_queue_policy']
+
+                if 'tts_queue_size' in settings:
+                    self.settings_panel.tts_queue_slider.setValue(settings['tts_queue_size'])
+                    self.config['tts_queue_size'] = settings['tts_queue_size']
+
+                if 'tts_max_age' in settings:
+                    self.settings_panel.tts_age_slider.setValue(settings['tts_max_age'])
+                    self.settings_panel.update_tts_age_label(settings['tts_max_age'])
+                    self.config['tts_max_age'] = settings['tts_max_age']
+
+                if 'tts_sample_every' in settings:
+                    self.config['tts_sample_every'] = settings['tts_sample_every']
+
+                self.tts_thread.configure_queue(self.config['tts_queue_policy'], self.config['tts_queue_size'],
+                                                self.config['tts_max_age'], self.config['tts_sample_every'])
+
+                if 'blacklist_fold_diacritics' in settings:
+                    fold = settings['blacklist_fold_diacritics']
+                    self.settings_panel.blacklist_fold_cb.setChecked(fold)
+                    self.config['blacklist_fold_diacritics'] = fold
+                    self.compile_blacklist()
+
+                if 'coalesce_spam' in settings:
+                    self.settings_panel.coalesce_cb.setChecked(settings['coalesce_spam'])
+                    self.config['coalesce_spam'] = settings['coalesce_spam']
+                    self.message_filter.enabled = settings['coalesce_spam']
+
+                if 'archive_enabled' in settings:
+                    self.settings_panel.archive_cb.setChecked(settings['archive_enabled'])
+                    self.config['archive_enabled'] = settings['archive_enabled']
+                    self.chat_archive.enabled = settings['archive_enabled']
                 
                 # Load blacklist to UI
                 if hasattr(self, 'blacklist') and self.blacklist: